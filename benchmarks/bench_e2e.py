@@ -0,0 +1,132 @@
+"""End-to-end benchmark of the poll -> notify path against local stubs.
+
+Drives the real fetch_homeworks -> check_response -> parse_status -> deliver
+path (the per-tenant form of get_api_answer and send_message) for a number
+of tenants and reports throughput, notification latency and memory.
+
+Usage: python benchmarks/bench_e2e.py --tenants 100 --rounds 5
+"""
+from concurrent.futures import ThreadPoolExecutor
+from os.path import abspath, dirname
+
+import argparse
+import gc
+import logging
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+import telegram  # noqa: E402
+from benchmarks.stubs import practicum_stub, telegram_stub  # noqa: E402
+from http_session import build_session  # noqa: E402
+from telegram.utils.request import Request  # noqa: E402
+from tenants import Tenant  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--payload-size', type=int, default=10)
+    parser.add_argument('--api-latency', type=float, default=0.0)
+    parser.add_argument('--api-error-rate', type=float, default=0.0)
+    parser.add_argument('--telegram-latency', type=float, default=0.0)
+    parser.add_argument('--telegram-error-rate', type=float, default=0.0)
+    return parser.parse_args()
+
+
+def poll(tenant, session, bot, started):
+    """Polls one tenant and notifies about changes, returns error or None."""
+    start = time.perf_counter()
+    try:
+        response = homework.fetch_homeworks(
+            tenant.cursor, tenant.token, session)
+        homeworks = homework.check_response(response)
+        tenant.cursor = homework.next_cursor(response, tenant.cursor)
+        for changed in tenant.statuses.diff(homeworks):
+            message = homework.parse_status(changed)
+            started[message] = start
+            homework.deliver(bot, tenant.chat_id, message)
+    except Exception as error:
+        return type(error).__name__
+    return None
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def state_memory(tenants_count, payload_size):
+    """Returns bytes of poll state kept per tenant after one poll."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tenants = []
+    for number in range(tenants_count):
+        tenant = Tenant(f'token{number}', number, cursor=1)
+        tenant.statuses.diff([
+            {'id': f'token{number}-{index}', 'status': 'approved'}
+            for index in range(payload_size)
+        ])
+        tenants.append(tenant)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return used / tenants_count
+
+
+def main():
+    args = parse_args()
+    logging.disable(logging.CRITICAL)
+    with practicum_stub(args.api_latency, args.api_error_rate,
+                        args.payload_size) as api, \
+            telegram_stub(args.telegram_latency,
+                          args.telegram_error_rate) as chat:
+        homework.ENDPOINT = api.url
+        session = build_session(pool_size=args.workers)
+        bot = telegram.Bot(
+            token='123:stub', base_url=f'{chat.url}bot',
+            request=Request(con_pool_size=args.workers))
+        tenants = [
+            Tenant(f'token{number}', number, cursor=1)
+            for number in range(args.tenants)
+        ]
+        started = {}
+        errors = {}
+        begin = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            for _ in range(args.rounds):
+                results = executor.map(
+                    lambda tenant: poll(tenant, session, bot, started),
+                    tenants)
+                for error in filter(None, results):
+                    errors[error] = errors.get(error, 0) + 1
+        elapsed = time.perf_counter() - begin
+        latencies = [
+            received - started[text]
+            for _, text, received in chat.httpd.received if text in started
+        ]
+        session.close()
+    polls = args.tenants * args.rounds
+    print(f'polls:              {polls}')
+    print(f'polls/sec:          {polls / elapsed:.1f}')
+    print(f'notifications:      {len(latencies)}')
+    print(f'latency p50:        {percentile(latencies, 0.5) * 1000:.2f} ms')
+    print(f'latency p99:        {percentile(latencies, 0.99) * 1000:.2f} ms')
+    if latencies:
+        print(f'latency mean:       {statistics.mean(latencies) * 1000:.2f} ms')
+    memory = state_memory(args.tenants, args.payload_size)
+    print(f'memory per tenant:  {memory:.0f} bytes')
+    print(f'errors:             {errors or "none"}')
+
+
+if __name__ == '__main__':
+    main()
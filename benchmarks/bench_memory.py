@@ -0,0 +1,78 @@
+"""Memory benchmark: bytes of poll state kept per tenant.
+
+Builds the roster, applies one decoded API response per tenant the way
+poll_changes() does and records one status change in the tenant history,
+then reports traced memory per tenant.
+
+Usage: python benchmarks/bench_memory.py [--tenants 10000 100000]
+"""
+from os.path import abspath, dirname
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+from tenants import Tenant  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tenants', type=int, nargs='+',
+                        default=[10000, 100000])
+    parser.add_argument('--payload-size', type=int, default=10)
+    return parser.parse_args()
+
+
+def response_body(number, payload_size):
+    """Returns API response body of the tenant as the API sends it."""
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': number * payload_size + index,
+                'homework_name': f'student{number}__hw{index:02}.zip',
+                'status': ('approved', 'reviewing')[index == 0],
+                'reviewer_comment': 'Всё хорошо',
+                'date_updated': '2022-06-01T10:00:00Z',
+                'lesson_name': f'Итоговый проект {index}',
+            }
+            for index in range(payload_size)
+        ],
+        'current_date': 1654077600,
+    })
+
+
+def state_memory(tenants_count, payload_size):
+    """Returns bytes kept per tenant after one poll of every tenant."""
+    bodies = [response_body(number, payload_size)
+              for number in range(tenants_count)]
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tenants = []
+    for number, body in enumerate(bodies):
+        tenant = Tenant(f'token{number}', number, cursor=1654000000)
+        changed = homework.apply_response(tenant, json.loads(body))
+        parsed, _ = homework.parse_homeworks(changed[:1])
+        tenant.remember(parsed)
+        tenants.append(tenant)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return used / tenants_count
+
+
+def main():
+    args = parse_args()
+    for count in args.tenants:
+        per_tenant = state_memory(count, args.payload_size)
+        print(f'{count:>7} tenants: {per_tenant:,.0f} B/tenant, '
+              f'{per_tenant * count / 2 ** 20:,.1f} MiB total')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Compares get_api_answer throughput with and without the pooled session.
+
+Usage: python benchmarks/bench_session.py [requests]
+"""
+from os.path import abspath, dirname
+
+import logging
+import sys
+import time
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+from benchmarks.stubs import practicum_stub  # noqa: E402
+from http_session import build_session  # noqa: E402
+
+
+def measure(requests_count, session=None):
+    """Returns requests per second for sequential polls."""
+    start = time.perf_counter()
+    for _ in range(requests_count):
+        homework.fetch_homeworks(1, 'token', session)
+    return requests_count / (time.perf_counter() - start)
+
+
+def main():
+    requests_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    logging.disable(logging.INFO)
+    with practicum_stub() as stub:
+        homework.ENDPOINT = stub.url
+        plain = measure(requests_count)
+        with build_session() as session:
+            pooled = measure(requests_count, session)
+    print(f'requests.get:   {plain:8.1f} req/s')
+    print(f'pooled session: {pooled:8.1f} req/s')
+    print(f'speedup:        {pooled / plain:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
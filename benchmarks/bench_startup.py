@@ -0,0 +1,73 @@
+"""Startup benchmark: import time of homework and time to the first poll.
+
+Both are measured in fresh interpreters; the first poll is the moment the
+local Practicum stub receives the first request from `python homework.py`.
+
+Usage: python benchmarks/bench_startup.py [runs]
+"""
+from os.path import abspath, dirname, join
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stubs import practicum_stub  # noqa: E402
+
+IMPORT_SCRIPT = (
+    'import time; start = time.perf_counter(); import homework; '
+    'print(time.perf_counter() - start)'
+)
+
+
+def import_time():
+    """Returns seconds spent importing homework in a fresh interpreter."""
+    output = subprocess.check_output(
+        [sys.executable, '-c', IMPORT_SCRIPT], cwd=ROOT)
+    return float(output)
+
+
+def time_to_first_poll(stub, workdir, timeout=30):
+    """Returns seconds from process start to the first API request."""
+    env = dict(
+        os.environ,
+        PRACTICUM_ENDPOINT=stub.url,
+        PRACTICUM_TOKEN='token',
+        TELEGRAM_TOKEN='123:stub',
+        TELEGRAM_CHAT_ID='1',
+        CHECKPOINT_FILE=join(workdir, 'checkpoint.sqlite3'),
+        LOG_LEVEL='WARNING',
+    )
+    seen = len(stub.httpd.hits)
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, join(ROOT, 'homework.py')], env=env, cwd=workdir,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start + timeout
+        while len(stub.httpd.hits) == seen:
+            if time.perf_counter() > deadline or process.poll() is not None:
+                raise RuntimeError('Bot did not poll the stub')
+            time.sleep(0.001)
+        return stub.httpd.hits[seen] - start
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    imports = [import_time() for _ in range(runs)]
+    with practicum_stub() as stub, tempfile.TemporaryDirectory() as workdir:
+        first_polls = [time_to_first_poll(stub, workdir) for _ in range(runs)]
+    print(f'import homework:    {statistics.median(imports) * 1000:.1f} ms')
+    print(f'time to first poll: {statistics.median(first_polls) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Replays a recorded traffic log through the bot loop on a virtual clock.
+
+Record a log by running the bot with RECORD_FILE=traffic.jsonl.gz, then:
+
+    python benchmarks/replay.py traffic.jsonl.gz [--factor 100000]
+
+Without a log, --synthetic writes one for --tenants tenants polled every
+--interval seconds over --days days, with statuses moving through
+reviewing -> rejected -> reviewing -> approved, and replays it.
+"""
+from os.path import abspath, dirname
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from recording import Recorder, replay  # noqa: E402
+
+STATUSES = ('reviewing', 'rejected', 'reviewing', 'approved')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('log', nargs='?')
+    parser.add_argument('--factor', type=float, default=None,
+                        help='virtual seconds per real second, '
+                             'unlimited by default')
+    parser.add_argument('--retry-time', type=int, default=None)
+    parser.add_argument('--synthetic', action='store_true')
+    parser.add_argument('--tenants', type=int, default=20)
+    parser.add_argument('--days', type=float, default=7)
+    parser.add_argument('--interval', type=int, default=600)
+    parser.add_argument('--homeworks', type=int, default=10)
+    return parser.parse_args()
+
+
+def synthesize(path, tenants, days, interval, homeworks, seed=0):
+    """Writes a log of API responses where statuses change at random."""
+    rng = random.Random(seed)
+    start = 1_600_000_000
+    changes = {
+        tenant: sorted(
+            rng.uniform(start, start + days * 86400)
+            for _ in range(len(STATUSES)))
+        for tenant in range(tenants)
+    }
+    clock = [start]
+    recorder = Recorder(path, clock=lambda: clock[0])
+    for moment in range(start, int(start + days * 86400), interval):
+        for tenant in range(tenants):
+            clock[0] = moment + tenant * interval / tenants
+            step = sum(change <= clock[0] for change in changes[tenant])
+            records = [
+                {'id': number, 'homework_name': f'hw{number}',
+                 'status': 'approved'}
+                for number in range(1, homeworks)
+            ]
+            if step:
+                records.insert(0, {'id': 0, 'homework_name': 'hw0',
+                                   'status': STATUSES[step - 1]})
+            recorder.write(
+                'api', tenant=f'tenant{tenant}', from_date=start, status=200,
+                body=json.dumps({'homeworks': records,
+                                 'current_date': int(clock[0])}))
+    recorder.close()
+
+
+def main():
+    args = parse_args()
+    path = args.log
+    synthetic = args.synthetic or path is None
+    if synthetic:
+        path = tempfile.mktemp(suffix='.jsonl.gz')
+        synthesize(path, args.tenants, args.days, args.interval,
+                   args.homeworks)
+    try:
+        report = replay(path, args.factor, args.retry_time)
+    finally:
+        if synthetic:
+            os.remove(path)
+    speedup = report['virtual_seconds'] / report['real_seconds']
+    print(f"tenants:            {report['tenants']}")
+    print(f"recorded:           {report['recorded_requests']} requests, "
+          f"{report['recorded_messages']} messages")
+    print(f"replayed:           {report['polls']} polls, "
+          f"{report['messages']} messages")
+    print(f"virtual time:       {report['virtual_seconds'] / 86400:.1f} days "
+          f"in {report['real_seconds']:.2f} s ({speedup:,.0f}x)")
+    print(f"throughput:         {report['polls_per_second']:,.0f} polls/s")
+    print(f"detection latency:  p50 {report['latency_p50']:.0f} s, "
+          f"p99 {report['latency_p99']:.0f} s, "
+          f"max {report['latency_max']:.0f} s")
+
+
+if __name__ == '__main__':
+    main()
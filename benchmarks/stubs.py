@@ -0,0 +1,126 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import itertools
+import json
+import random
+import threading
+import time
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Common behaviour of stub handlers."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def respond(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def delay(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        return random.random() < server.error_rate
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PracticumHandler(StubHandler):
+    """Answers homework_statuses requests like the Practicum API does.
+
+    The first homework of every token flips between reviewing and approved
+    on each request, the rest of the payload_size homeworks stay approved.
+    """
+
+    def do_GET(self):
+        server = self.server
+        server.hits.append(time.perf_counter())
+        if self.delay():
+            return self.respond(500, {'error': 'stub failure'})
+        token = self.headers.get('Authorization', '')[len('OAuth '):]
+        with server.lock:
+            poll = server.polls[token] = server.polls.get(token, 0) + 1
+        homeworks = server.homeworks or [
+            {
+                'id': f'{token}-{number}',
+                'homework_name': f'{token}-{number}',
+                'status': 'approved',
+            }
+            for number in range(server.payload_size)
+        ]
+        if homeworks and not server.homeworks:
+            homeworks[0]['homework_name'] = f'{token}-0-{poll}'
+            homeworks[0]['status'] = ('reviewing', 'approved')[poll % 2]
+        return self.respond(200, {
+            'homeworks': homeworks,
+            'current_date': int(time.time()),
+        })
+
+
+class TelegramHandler(StubHandler):
+    """Accepts Bot API sendMessage calls and records their arrival."""
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if self.delay():
+            return self.respond(500, {'ok': False, 'error_code': 500,
+                                      'description': 'stub failure'})
+        with server.lock:
+            server.received.append(
+                (payload.get('chat_id'), payload.get('text'),
+                 time.perf_counter()))
+        return self.respond(200, {'ok': True, 'result': {
+            'message_id': next(server.message_ids),
+            'date': int(time.time()),
+            'chat': {'id': payload.get('chat_id'), 'type': 'private'},
+            'text': payload.get('text'),
+        }})
+
+
+class StubServer:
+    """Runs a stub HTTP server in a background thread."""
+
+    def __init__(self, handler, **options):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        for name, value in options.items():
+            setattr(self.httpd, name, value)
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f'http://{host}:{port}/'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def practicum_stub(latency=0.0, error_rate=0.0, payload_size=1,
+                   homeworks=None):
+    """Creates stub of the homework_statuses endpoint."""
+    return StubServer(
+        PracticumHandler, latency=latency, error_rate=error_rate,
+        payload_size=payload_size, homeworks=homeworks, polls={}, hits=[])
+
+
+def telegram_stub(latency=0.0, error_rate=0.0):
+    """Creates stub of the Telegram Bot API."""
+    return StubServer(
+        TelegramHandler, latency=latency, error_rate=error_rate,
+        received=[], message_ids=itertools.count(1))
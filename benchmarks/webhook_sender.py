@@ -0,0 +1,115 @@
+"""Load test sender for the webhook ingestion mode.
+
+Pushes status events in homework_statuses shape to a receiver. Without
+--url a local receiver is started, wired to the real apply_response ->
+parse_homeworks -> notify path with an in-memory outbox stand-in.
+
+Usage: python benchmarks/webhook_sender.py --chats 100 --events 5000
+"""
+from concurrent.futures import ThreadPoolExecutor
+from os.path import abspath, dirname
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+import requests  # noqa: E402
+from coalesce import Coalescer  # noqa: E402
+from http_session import build_session  # noqa: E402
+from tenants import Tenant  # noqa: E402
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+class CountingBot:
+    """Counts messages instead of sending them."""
+
+    def __init__(self):
+        self.sent = 0
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text, **kwargs):
+        with self.lock:
+            self.sent += 1
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', help='events endpoint of a running bot')
+    parser.add_argument(
+        '--secret', default=os.getenv('WEBHOOK_SECRET', 'benchmark'))
+    parser.add_argument('--chats', type=int, default=100)
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=16)
+    return parser.parse_args()
+
+
+def event(number):
+    return json.dumps({
+        'homeworks': [{
+            'id': number % 7,
+            'homework_name': f'hw{number % 7}',
+            'status': STATUSES[number % len(STATUSES)],
+        }],
+        'current_date': int(time.time()),
+    })
+
+
+def start_local_receiver(chats, secret):
+    tenants = [Tenant(f'token{chat}', chat, cursor=1) for chat in range(chats)]
+    bot = CountingBot()
+    coalescer = Coalescer(bot, window=0).start()
+    receiver = homework.start_webhook(
+        tenants, coalescer, None, port=0, host='127.0.0.1', secret=secret)
+    return receiver, coalescer, bot
+
+
+def main():
+    args = parse_args()
+    logging.disable(logging.CRITICAL)
+    local = None
+    url = args.url
+    if url is None:
+        local = start_local_receiver(args.chats, args.secret)
+        url = local[0].url
+    session = build_session(pool_size=args.workers, retries=0)
+    headers = {
+        'Content-Type': 'application/json',
+        'X-Webhook-Secret': args.secret,
+    }
+
+    def send(number):
+        try:
+            response = session.post(
+                f'{url}{number % args.chats}', data=event(number),
+                headers=headers)
+            return response.status_code
+        except requests.RequestException as error:
+            return type(error).__name__
+
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        results = list(executor.map(send, range(args.events)))
+    elapsed = time.perf_counter() - begin
+    codes = {}
+    for code in results:
+        codes[code] = codes.get(code, 0) + 1
+    print(f'events:     {args.events}')
+    print(f'events/sec: {args.events / elapsed:.1f}')
+    print(f'responses:  {codes}')
+    if local is not None:
+        receiver, coalescer, bot = local
+        receiver.stop()
+        coalescer.stop()
+        print(f'messages:   {bot.sent}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+from state import StatusIndex
+
+import json
+import os
+import sqlite3
+import threading
+
+CHECKPOINT_FILE = os.getenv('CHECKPOINT_FILE', 'checkpoint.sqlite3')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cursors (
+    chat_id TEXT PRIMARY KEY,
+    cursor INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS statuses (
+    chat_id TEXT NOT NULL,
+    homework_key TEXT NOT NULL,
+    status TEXT,
+    name TEXT,
+    PRIMARY KEY (chat_id, homework_key)
+);
+'''
+
+
+class Checkpoint:
+    """SQLite store of tenant cursors and last seen homework statuses."""
+
+    def __init__(self, path=CHECKPOINT_FILE):
+        """Opens the store, creating its tables."""
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        columns = [
+            row[1] for row in self.connection.execute(
+                'PRAGMA table_info(statuses)')
+        ]
+        if 'name' not in columns:
+            with self.connection:
+                self.connection.execute(
+                    'ALTER TABLE statuses ADD COLUMN name TEXT')
+
+    def load(self):
+        """Reads the whole store as {chat_id: (cursor, statuses)}."""
+        state = {
+            chat_id: (cursor, {})
+            for chat_id, cursor in self.connection.execute(
+                'SELECT chat_id, cursor FROM cursors')
+        }
+        rows = self.connection.execute(
+            'SELECT chat_id, homework_key, status FROM statuses')
+        for chat_id, key, status in rows:
+            if chat_id in state:
+                state[chat_id][1][json.loads(key)] = status
+        return state
+
+    def names(self, chat_id):
+        """Returns {homework key: name} stored for the chat.
+
+        Names are read on demand and not kept in tenant state.
+        """
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT homework_key, name FROM statuses '
+                'WHERE chat_id = ? AND name IS NOT NULL',
+                (str(chat_id),)).fetchall()
+        return {json.loads(key): name for key, name in rows}
+
+    def restore(self, tenants):
+        """Applies stored state to tenants, returns how many were found."""
+        state = self.load()
+        restored = 0
+        for tenant in tenants:
+            saved = state.get(str(tenant.chat_id))
+            if saved is None:
+                continue
+            tenant.cursor, statuses = saved
+            tenant.statuses = StatusIndex(statuses)
+            restored += 1
+        return restored
+
+    def save(self, tenant, changed=()):
+        """Stores the tenant cursor and statuses of parsed changed records."""
+        chat_id = str(tenant.chat_id)
+        with self._lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO cursors VALUES (?, ?)',
+                (chat_id, tenant.cursor))
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?, ?)',
+                [
+                    (chat_id, json.dumps(record.key), record.status,
+                     record.name)
+                    for record in changed
+                ])
+
+    def close(self):
+        """Moves the write-ahead log into the database and closes it."""
+        with self._lock:
+            self.connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self.connection.close()
@@ -0,0 +1,104 @@
+from exceptions import CircuitOpenException
+from metrics import CIRCUIT_STATE
+from scheduler import RETRYABLE_ERRORS
+
+import logging
+import os
+import threading
+import time
+
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 5))
+BREAKER_RESET_TIMEOUT = int(os.getenv('BREAKER_RESET_TIMEOUT', 60))
+
+CLOSED = 0
+HALF_OPEN = 1
+OPEN = 2
+
+
+class CircuitBreaker:
+    """Stops calling the API after consecutive failures.
+
+    Opens after threshold API errors in a row, lets probes through once
+    reset_timeout has passed and closes again on the first success.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD,
+                 reset_timeout=BREAKER_RESET_TIMEOUT, probes=1,
+                 clock=time.monotonic):
+        """Starts closed."""
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.probes = probes
+        self.clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0
+        self._probing = 0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(CLOSED)
+
+    def _move(self, state):
+        if state != self._state:
+            logging.warning(f'Circuit breaker {self._state} -> {state}')
+            self._state = state
+            CIRCUIT_STATE.set(state)
+
+    @property
+    def state(self):
+        """Returns CLOSED, HALF_OPEN or OPEN."""
+        with self._lock:
+            return self._current()
+
+    def _current(self):
+        if (self._state == OPEN
+                and self.clock() >= self._opened_at + self.reset_timeout):
+            self._probing = 0
+            self._move(HALF_OPEN)
+        return self._state
+
+    def allow(self):
+        """Raises CircuitOpenException unless a call may go through."""
+        with self._lock:
+            state = self._current()
+            if state == OPEN:
+                raise CircuitOpenException(
+                    'API calls suspended',
+                    self._opened_at + self.reset_timeout - self.clock())
+            if state == HALF_OPEN:
+                if self._probing >= self.probes:
+                    raise CircuitOpenException(
+                        'API probe in progress', self.reset_timeout)
+                self._probing += 1
+
+    def success(self):
+        """Records a call that reached the API."""
+        with self._lock:
+            self._failures = 0
+            self._probing = 0
+            self._move(CLOSED)
+
+    def failure(self):
+        """Records an API error, opening the circuit when needed."""
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.threshold:
+                self._opened_at = self.clock()
+                self._move(OPEN)
+
+    def call(self, func, *args):
+        """Calls func through the breaker.
+
+        Only API errors count as failures; any other exception means the
+        API answered and is passed through as a success.
+        """
+        self.allow()
+        try:
+            result = func(*args)
+        except RETRYABLE_ERRORS:
+            self.failure()
+            raise
+        except Exception:
+            self.success()
+            raise
+        self.success()
+        return result
@@ -0,0 +1,138 @@
+import logging
+import os
+import threading
+import time
+
+COALESCE_WINDOW = float(os.getenv('COALESCE_WINDOW', 5))
+SEPARATOR = '\n\n'
+
+
+class Coalescer:
+    """Merges status changes of one chat within a window into one message.
+
+    A homework changing again inside the window replaces its pending
+    message, so intermediate statuses are never sent. With a ledger,
+    messages already delivered are dropped from the batch and delivery ids
+    of the rest are passed to the bot to commit once sent.
+    """
+
+    def __init__(self, bot, window=COALESCE_WINDOW, clock=time.monotonic,
+                 ledger=None):
+        """Prepares the coalescer, call start() to flush batches."""
+        self.bot = bot
+        self.window = window
+        self.ledger = ledger
+        self.clock = clock
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self.collapsed = 0
+        self.batches = 0
+        self.duplicates = 0
+
+    def add(self, chat_id, key, message, delivery_id=None):
+        """Schedules message about the homework for the chat.
+
+        With a ledger the message is stored as pending first, so it
+        survives a crash before it is sent.
+        """
+        if self.ledger is not None and delivery_id is not None:
+            try:
+                self.ledger.expect(chat_id, key, message, delivery_id)
+            except Exception as error:
+                logging.error(f'Уведомление не сохранено в журнал: {error}')
+        with self._condition:
+            pending = self._pending.get(chat_id)
+            if pending is None:
+                pending = (self.clock() + self.window, {})
+                self._pending[chat_id] = pending
+            messages = pending[1]
+            if key in messages:
+                self.collapsed += 1
+            messages[key] = (message, delivery_id)
+            self._condition.notify_all()
+
+    def requeue(self, tenants):
+        """Queues again notifications of the tenants never delivered.
+
+        Returns how many were found. Called when tenants are restored,
+        as their checkpoint already counts these changes as seen.
+        """
+        if self.ledger is None:
+            return 0
+        chats = {str(tenant.chat_id): tenant.chat_id for tenant in tenants}
+        pending = self.ledger.pending(chats)
+        for chat_id, key, message, delivery in pending:
+            self.add(chats[chat_id], key, message, delivery)
+        return len(pending)
+
+    def _pop_due(self, now):
+        due = [
+            (chat_id, messages)
+            for chat_id, (deadline, messages) in self._pending.items()
+            if deadline <= now
+        ]
+        for chat_id, _ in due:
+            del self._pending[chat_id]
+        return due
+
+    def _send(self, batches):
+        for chat_id, messages in batches:
+            parts = [
+                (message, delivery) for message, delivery in messages.values()
+                if not self._delivered(delivery)
+            ]
+            self.duplicates += len(messages) - len(parts)
+            if not parts:
+                continue
+            self.batches += 1
+            text = SEPARATOR.join(message for message, _ in parts)
+            deliveries = [delivery for _, delivery in parts if delivery]
+            options = {'delivery_ids': deliveries} if deliveries else {}
+            try:
+                self.bot.send_message(chat_id, text, **options)
+            except Exception as error:
+                logging.error(f'Cбой при отправке сообщения {error}')
+
+    def _delivered(self, delivery):
+        if delivery is None or self.ledger is None:
+            return False
+        if self.ledger.seen(delivery):
+            logging.info('Уведомление уже было отправлено, пропускаем')
+            return True
+        return False
+
+    def _work(self):
+        while True:
+            with self._condition:
+                if self._stopping:
+                    return
+                now = self.clock()
+                due = self._pop_due(now)
+                if not due:
+                    deadlines = [d for d, _ in self._pending.values()]
+                    timeout = min(deadlines) - now if deadlines else None
+                    self._condition.wait(timeout)
+                    continue
+            self._send(due)
+
+    def start(self):
+        """Starts the flushing thread."""
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Sends everything still pending and stops the flushing thread."""
+        with self._condition:
+            self._stopping = True
+            due = self._pop_due(float('inf'))
+            self._condition.notify_all()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._send(due)
+
+    def depth(self):
+        """Returns number of chats with pending messages."""
+        with self._condition:
+            return len(self._pending)
@@ -0,0 +1,107 @@
+from datetime import datetime
+
+import logging
+import os
+
+BOT_COMMANDS = os.getenv('BOT_COMMANDS') == '1'
+STATUS_NAMES = {
+    'approved': 'принята',
+    'reviewing': 'на ревью',
+    'rejected': 'возвращена с замечаниями',
+}
+NOT_SUBSCRIBED = 'Этот чат не подписан на уведомления о статусе работ.'
+NOTHING_YET = 'Пока нет данных о работах, дождитесь первой проверки.'
+TIME_FORMAT = '%d.%m %H:%M'
+
+
+def _time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime(TIME_FORMAT)
+
+
+def status_text(tenant, names=None):
+    """Describes last known status of every homework of the tenant.
+
+    Names of homeworks missing from the history are taken from names.
+    """
+    names = dict(names or {})
+    with tenant.lock:
+        statuses = list(tenant.statuses.items())
+        names.update((change.key, change.name) for change in tenant.history)
+        checked_at = tenant.checked_at
+    if not statuses:
+        return NOTHING_YET
+    lines = [
+        f'{names.get(key, key)}: {STATUS_NAMES.get(status, status)}'
+        for key, status in statuses
+    ]
+    if checked_at:
+        lines.append(f'Проверено {_time(checked_at)}')
+    return '\n'.join(lines)
+
+
+def history_text(tenant):
+    """Describes recent status changes of the tenant, newest first."""
+    with tenant.lock:
+        history = list(tenant.history)
+    if not history:
+        return NOTHING_YET
+    return '\n'.join(
+        f'{_time(change.at)} {change.name}: '
+        f'{STATUS_NAMES.get(change.status, change.status)}'
+        for change in reversed(history))
+
+
+COMMANDS = {'status': status_text, 'history': history_text}
+
+
+class CommandServer:
+    """Answers /status and /history from tenant state kept by the poll loop.
+
+    Updates are received by a telegram.ext.Updater in its own threads and
+    replies never wait for the Practicum API. Homework names are read
+    from the checkpoint, if given, so they survive a restart.
+    """
+
+    def __init__(self, tenants, token=None, checkpoint=None):
+        """Prepares the server, call start() to receive commands."""
+        self.token = token
+        self.checkpoint = checkpoint
+        self.route(tenants)
+        self.updater = None
+        self.answered = 0
+
+    def route(self, tenants):
+        """Replaces the tenants commands are answered for."""
+        self.tenants = {str(tenant.chat_id): tenant for tenant in tenants}
+
+    def reply(self, chat_id, command):
+        """Returns reply to the command sent from the chat."""
+        tenant = self.tenants.get(str(chat_id))
+        if tenant is None:
+            return NOT_SUBSCRIBED
+        self.answered += 1
+        if command == 'status' and self.checkpoint is not None:
+            return status_text(tenant, self.checkpoint.names(tenant.chat_id))
+        return COMMANDS[command](tenant)
+
+    def _handle(self, update, context):
+        message = update.effective_message
+        command = message.text.split()[0].lstrip('/').split('@')[0]
+        chat_id = update.effective_chat.id
+        message.reply_text(self.reply(chat_id, command))
+
+    def start(self):
+        """Starts receiving commands in background threads."""
+        from telegram.ext import CommandHandler, Updater
+        self.updater = Updater(token=self.token, use_context=True)
+        for command in COMMANDS:
+            self.updater.dispatcher.add_handler(
+                CommandHandler(command, self._handle))
+        self.updater.start_polling(drop_pending_updates=True)
+        logging.info('Bot commands are served')
+        return self
+
+    def stop(self):
+        """Stops receiving commands."""
+        if self.updater is not None:
+            self.updater.stop()
@@ -0,0 +1,126 @@
+from json import JSONDecodeError
+
+import codecs
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+
+
+def loads(data):
+    """Decodes JSON with orjson when it is installed, stdlib otherwise."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def decode_response(response):
+    """Decodes body of an API response."""
+    return loads(response.content)
+
+
+class HomeworkStream:
+    """Iterates homeworks of a response body without loading it whole.
+
+    Yields records of the top level homeworks array one by one while the
+    body is being read; other top level keys such as current_date are
+    collected into fields and are complete once iteration is over.
+    """
+
+    def __init__(self, chunks):
+        """Decodes the chunks of a response body as UTF-8."""
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._exhausted = False
+        self.fields = {}
+
+    @property
+    def current_date(self):
+        """Returns current_date of the response once it was read."""
+        return self.fields.get('current_date')
+
+    def _read(self):
+        """Appends next chunk to the buffer, returns False at the end."""
+        if self._exhausted:
+            return False
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self._buffer += self._text.decode(chunk)
+                return True
+        self._buffer += self._text.decode(b'', final=True)
+        self._exhausted = True
+        return False
+
+    def _skip(self):
+        """Skips whitespace, returns next character or '' at the end."""
+        while True:
+            while (self._pos < len(self._buffer)
+                   and self._buffer[self._pos] in WHITESPACE):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                return ''
+
+    def _expect(self, characters):
+        character = self._skip()
+        if character == '' or character not in characters:
+            raise JSONDecodeError(
+                f'Expecting one of {characters!r}', self._buffer, self._pos)
+        self._pos += 1
+        return character
+
+    def _value(self):
+        """Decodes next complete value, reading more data when needed."""
+        self._skip()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except JSONDecodeError:
+                if not self._read():
+                    raise
+                continue
+            if end == len(self._buffer) and self._read():
+                continue
+            self._pos = end
+            return value
+
+    def _homeworks(self):
+        self._expect('[')
+        if self._skip() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._expect(',]') == ']':
+                return
+
+    def __iter__(self):
+        """Yields homework records while the body is read."""
+        self._expect('{')
+        found = False
+        if self._skip() == '}':
+            self._pos += 1
+        else:
+            while True:
+                key = self._value()
+                self._expect(':')
+                if key == 'homeworks':
+                    found = True
+                    yield from self._homeworks()
+                else:
+                    self.fields[key] = self._value()
+                if self._expect(',}') == '}':
+                    break
+        if not found:
+            raise KeyError('No new status received')
@@ -0,0 +1,334 @@
+from checkpoint import Checkpoint
+from circuit import CircuitBreaker
+from coalesce import COALESCE_WINDOW, Coalescer
+from commands import BOT_COMMANDS, CommandServer
+from exceptions import TokensValidationError
+from homework import (
+    RETRY_TIME,
+    LIMITER,
+    build_scheduler,
+    notify,
+    parse_homeworks,
+    poll_changes,
+    read_tokens,
+    start_webhook
+)
+from http_session import build_session
+from ledger import DeliveryLedger
+from metrics import LOOP_LAG, METRICS_PORT, expose
+from outbox import Outbox
+from recording import RECORD_FILE, Recorder, RecordingBot, RecordingSession
+from shutdown import SHUTDOWN_TIMEOUT, STOP_SIGNALS, DaemonExecutor
+from tenants import FileWatcher, load_roster, merge_roster
+from webhook import WEBHOOK_PORT
+
+import asyncio
+import logging
+import os
+import signal
+
+TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
+ROSTER_FILE = os.getenv('ROSTER_FILE', 'roster.json')
+MAX_CONCURRENCY = int(os.getenv('MAX_CONCURRENCY', 50))
+
+
+class PollingEngine:
+    """Polls many tenants concurrently from a single event loop."""
+
+    def __init__(self, tenants, bot, max_concurrency=MAX_CONCURRENCY,
+                 retry_time=RETRY_TIME, checkpoint=None, scheduler=None,
+                 coalesce_window=COALESCE_WINDOW, breaker=None,
+                 metrics_port=METRICS_PORT, ledger=None, limiter=LIMITER,
+                 session=None, watcher=None, select=None,
+                 shutdown_timeout=SHUTDOWN_TIMEOUT, make_bot=None):
+        """Prepares the engine, call run() to start polling."""
+        self.roster = list(tenants)
+        self.select = select
+        self.tenants = self.owned()
+        self.outbox = bot if isinstance(bot, Outbox) else Outbox(
+            bot, ledger=ledger)
+        self.coalescer = Coalescer(
+            self.outbox, window=coalesce_window, ledger=ledger)
+        self.checkpoint = checkpoint
+        self.scheduler = scheduler or build_scheduler(retry_time)
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter
+        self.retry_time = retry_time
+        self.max_concurrency = max_concurrency
+        self.metrics_port = metrics_port
+        self.watcher = watcher
+        self.make_bot = make_bot
+        self.telegram_token = TELEGRAM_TOKEN
+        self.shutdown_timeout = shutdown_timeout
+        self.receiver = None
+        self.commands = None
+        self._tasks = {}
+        self._stopping = None
+        self._executor = DaemonExecutor(max_concurrency)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.session = session or build_session(pool_size=max_concurrency)
+
+    async def _blocking(self, func, *args):
+        """Runs blocking call in the pool, bounded by the semaphore."""
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            return await loop.run_in_executor(self._executor, func, *args)
+
+    async def poll_tenant(self, tenant):
+        """Polls API once for the tenant and reports changed statuses."""
+        if self.limiter is not None:
+            await self.limiter.acquire_async(tenant.token)
+        parsed = await self._blocking(self._poll, tenant)
+        return [record.message for record in parsed]
+
+    def _poll(self, tenant):
+        """Polls and notifies in the pool, where SQLite may wait on locks."""
+        changed = poll_changes(tenant, self.session, self.breaker)
+        parsed, _ = parse_homeworks(changed)
+        notify(self.coalescer, self.checkpoint, tenant, parsed)
+        return parsed
+
+    async def pause(self, delay):
+        """Sleeps for delay, returns False once the engine is stopping."""
+        if self._stopping is None:
+            await asyncio.sleep(delay)
+            return True
+        try:
+            await asyncio.wait_for(self._stopping.wait(), delay)
+        except asyncio.TimeoutError:
+            return True
+        return False
+
+    async def run_tenant(self, tenant, delay=0):
+        """Keeps polling the tenant until cancelled or stopped."""
+        if not await self.pause(delay):
+            return
+        while True:
+            try:
+                await self.poll_tenant(tenant)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                logging.error(f'Сбой в работе программы для {tenant}: {error}')
+                delay = self.scheduler.failure(tenant, error)
+            else:
+                delay = self.scheduler.success(tenant)
+            loop = asyncio.get_running_loop()
+            planned = loop.time() + delay
+            if not await self.pause(delay):
+                return
+            LOOP_LAG.observe(loop.time() - planned)
+
+    def stop(self):
+        """Stops new polls, running ones are let finish by run()."""
+        if self._stopping is not None and not self._stopping.is_set():
+            logging.info('Получен сигнал остановки, завершаем работу')
+            self._stopping.set()
+
+    def assign(self, tenants):
+        """Switches polling to the given tenants, returns (added, removed).
+
+        Tenants kept from the previous set go on polling undisturbed. New
+        ones are restored from the checkpoint, their undelivered
+        notifications are queued again and their first polls are spread
+        over a cycle. Must be called from the running event loop.
+        """
+        wanted = {tenant.chat_id: tenant for tenant in tenants}
+        current = {tenant.chat_id for tenant in self.tenants}
+        removed = [
+            tenant for tenant in self.tenants if tenant.chat_id not in wanted]
+        added = [
+            tenant for chat_id, tenant in wanted.items()
+            if chat_id not in current]
+        for tenant in removed:
+            task = self._tasks.pop(tenant.chat_id, None)
+            if task is not None:
+                task.cancel()
+            self.scheduler.forget(tenant)
+        if added and self.checkpoint is not None:
+            restored = self.checkpoint.restore(added)
+            logging.info(f'State restored for {restored} tenants')
+        if added:
+            requeued = self.coalescer.requeue(added)
+            if requeued:
+                logging.info(f'{requeued} undelivered notifications queued')
+        step = self.retry_time / max(len(added), 1)
+        for index, tenant in enumerate(added):
+            self._tasks[tenant.chat_id] = asyncio.create_task(
+                self.run_tenant(tenant, index * step))
+        self.tenants = [
+            tenant for tenant in self.tenants if tenant.chat_id in wanted
+        ] + added
+        for server in (self.receiver, self.commands):
+            if server is not None:
+                server.route(self.tenants)
+        return added, removed
+
+    def owned(self):
+        """Returns tenants of the roster this engine should poll."""
+        return list(self.select(self.roster) if self.select else self.roster)
+
+    def reload(self, roster):
+        """Applies a reloaded roster, returns (added, removed, rotated).
+
+        Tenants still listed keep their state, session and polling task,
+        only their Practicum token is swapped if it was rotated.
+        """
+        self.roster, rotated = merge_roster(self.tenants, roster)
+        added, removed = self.assign(self.owned())
+        return added, removed, rotated
+
+    def reload_bot(self):
+        """Swaps the Telegram bot if TELEGRAM_TOKEN was rotated.
+
+        Needs make_bot, returns True if the bot was replaced.
+        """
+        token = read_tokens()['TELEGRAM_TOKEN']
+        if self.make_bot is None or not token or token == self.telegram_token:
+            return False
+        self.telegram_token = token
+        self.outbox.bot = self.make_bot(token)
+        if self.commands is not None:
+            self.commands.stop()
+            self.commands.token = token
+            self.commands.start()
+        logging.info('Tokens reloaded: TELEGRAM_TOKEN')
+        return True
+
+    async def watch_roster(self):
+        """Reloads the roster and TELEGRAM_TOKEN on SIGHUP.
+
+        The roster is also reloaded when its file changes.
+        """
+        hangup = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGHUP, hangup.set)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            logging.warning('SIGHUP is not available, watching roster file')
+        while True:
+            try:
+                await asyncio.wait_for(hangup.wait(), self.watcher.interval)
+            except asyncio.TimeoutError:
+                if not self.watcher.changed():
+                    continue
+            hangup.clear()
+            await self._blocking(self.reload_bot)
+            try:
+                roster = load_roster(self.watcher.path)
+            except (OSError, ValueError, TokensValidationError) as error:
+                logging.error(f'Ростер не перечитан, опрос продолжается '
+                              f'по прежнему: {error}')
+                continue
+            added, removed, rotated = self.reload(roster)
+            logging.info(
+                f'Roster reloaded: +{len(added)} -{len(removed)}, '
+                f'{len(rotated)} tokens rotated, '
+                f'polling {len(self.tenants)} tenants')
+
+    async def drain(self):
+        """Waits for running polls and queued messages within the timeout.
+
+        Polls get half of it, the rest is left to send their messages.
+        Polls still running after that are abandoned in daemon threads.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.shutdown_timeout
+        tasks = list(self._tasks.values())
+        if tasks:
+            _, pending = await asyncio.wait(
+                tasks, timeout=self.shutdown_timeout / 2)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logging.warning(f'{len(pending)} polls cancelled on shutdown')
+        if self.receiver is not None:
+            self.receiver.stop()
+        self._executor.shutdown(wait=False)
+        self.coalescer.stop()
+        if not self.outbox.stop(timeout=max(deadline - loop.time(), 0)):
+            logging.error('Очередь сообщений не отправлена до остановки')
+        self.session.close()
+
+    async def run(self):
+        """Polls every tenant until SIGTERM, SIGINT or stop().
+
+        First polls are spread over a cycle. On stop no new polls start,
+        running ones and queued messages get shutdown_timeout to finish.
+        """
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        for signum in STOP_SIGNALS:
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        self.outbox.start()
+        expose(self.outbox, self.scheduler, self.metrics_port)
+        self.coalescer.start()
+        tenants, self.tenants = self.tenants, []
+        self.assign(tenants)
+        if WEBHOOK_PORT:
+            self.receiver = start_webhook(
+                self.tenants, self.coalescer, self.checkpoint)
+        watching = None
+        if self.watcher is not None:
+            watching = asyncio.create_task(self.watch_roster())
+        try:
+            await self._stopping.wait()
+        finally:
+            self.stop()
+            if watching is not None:
+                watching.cancel()
+            await self.drain()
+            for signum in STOP_SIGNALS:
+                loop.remove_signal_handler(signum)
+
+
+def main():
+    """Runs the polling engine for every tenant in the roster."""
+    if not TELEGRAM_TOKEN:
+        logging.error('Tokens cant be validated')
+        raise TokensValidationError('Tokens cant be validated')
+    import telegram
+    tenants = load_roster(ROSTER_FILE)
+    logging.info(f'Loaded {len(tenants)} tenants from {ROSTER_FILE}')
+    session = None
+    recorder = None
+    if RECORD_FILE:
+        recorder = Recorder(RECORD_FILE)
+        session = RecordingSession(
+            build_session(pool_size=MAX_CONCURRENCY), recorder)
+        logging.info(f'Recording traffic to {RECORD_FILE}')
+
+    def make_bot(token):
+        bot = telegram.Bot(token=token)
+        return bot if recorder is None else RecordingBot(bot, recorder)
+
+    checkpoint = Checkpoint()
+    ledger = DeliveryLedger()
+    engine = PollingEngine(
+        tenants, make_bot(TELEGRAM_TOKEN), checkpoint=checkpoint,
+        ledger=ledger, session=session, watcher=FileWatcher(ROSTER_FILE),
+        make_bot=make_bot)
+    if BOT_COMMANDS:
+        engine.commands = CommandServer(
+            tenants, TELEGRAM_TOKEN, checkpoint).start()
+    try:
+        asyncio.run(engine.run())
+    finally:
+        if engine.commands is not None:
+            engine.commands.stop()
+        checkpoint.close()
+        ledger.close()
+        if recorder is not None:
+            recorder.close()
+
+
+if __name__ == '__main__':
+    from log_logic import setup_logging
+    listener = setup_logging()
+    try:
+        main()
+    finally:
+        listener.stop()
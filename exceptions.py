@@ -8,6 +8,14 @@ class APIUnavailableException(Exception):
     pass
 
 
+class APIRequestRejectedException(Exception):
+    '''API rejected the request of one tenant, e.g. a revoked token'''
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
 class NotDictError(Exception):
     '''Dictionary not received'''
     pass
@@ -26,3 +34,11 @@ class HomeworkDataError(Exception):
 class TokensValidationError(Exception):
     '''Tokens cant be validated'''
     pass
+
+
+class CircuitOpenException(APIUnavailableException):
+    '''API calls suspended by the circuit breaker'''
+
+    def __init__(self, message, retry_after=0):
+        super().__init__(message)
+        self.retry_after = retry_after
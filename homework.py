@@ -1,23 +1,29 @@
+from collections import namedtuple
+from decoding import CHUNK_SIZE, HomeworkStream, decode_response
 from exceptions import (
     APINotRespondedException,
+    APIRequestRejectedException,
     APIUnavailableException,
-    HomeworkDataError,
     HomeworkStatusError,
     TokensValidationError
 )
 from http import HTTPStatus
-from logging import StreamHandler
-from dotenv import load_dotenv
+from metrics import API_RESPONSES, LOOP_LAG, expose, timed
+from ratelimit import RateLimiter
+from scheduler import PollScheduler
+from shutdown import DaemonExecutor, Shutdown
+from state import StatusIndex
+from tenants import FileWatcher, Tenant
 from json.decoder import JSONDecodeError
 
 import logging
 import os
-import requests
-import sys
-import telegram
 import time
 
-load_dotenv()
+ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+if os.path.exists(ENV_FILE):
+    from dotenv import load_dotenv
+    load_dotenv(ENV_FILE, override=True)
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
@@ -28,8 +34,11 @@ TOKENS = {'PRACTICUM_TOKEN': PRACTICUM_TOKEN,
           'TELEGRAM_CHAT_ID': TELEGRAM_CHAT_ID}
 
 RETRY_TIME = 600
-ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+REQUEST_TIMEOUT = float(os.getenv('REQUEST_TIMEOUT', 10))
+STREAM_HOMEWORKS = os.getenv('STREAM_HOMEWORKS') == '1'
+ENDPOINT = os.getenv(
+    'PRACTICUM_ENDPOINT',
+    'https://practicum.yandex.ru/api/user_api/homework_statuses/')
 
 
 HOMEWORK_STATUSES = {
@@ -37,43 +46,119 @@ HOMEWORK_STATUSES = {
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
-HEADERS = {'Authorization': f"OAuth {PRACTICUM_TOKEN}"}
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.DEBUG)
+MESSAGE_PREFIX = 'Изменился статус проверки работы "'
+MESSAGE_SUFFIXES = {
+    status: f'". {verdict}' for status, verdict in HOMEWORK_STATUSES.items()
+}
+PARSE_ERRORS = (TypeError, KeyError, HomeworkStatusError)
+
+ParsedHomework = namedtuple(
+    'ParsedHomework', ('key', 'name', 'status', 'message', 'updated'),
+    defaults=(None,))
+
+SESSION = None
+LIMITER = RateLimiter()
+NOT_MODIFIED = object()
 
-handler = StreamHandler(stream=sys.stdout)
-logging.getLogger('').addHandler(handler)
+
+@timed('send_message')
+def deliver(bot, chat_id, message):
+    """Sends message to the given chat, letting errors propagate."""
+    bot.send_message(chat_id, message)
 
 
 def send_message(bot, message):
     """Sends message from parse_status function to telegram bot chat."""
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        deliver(bot, TELEGRAM_CHAT_ID, message)
         logging.info('удачная отправка сообщения в Telegram')
     except Exception as error:
         logging.error(f'Cбой при отправке сообщения в Telegram {error}')
 
 
-def get_api_answer(current_timestamp):
-    """Receives response from Yandex API."""
+def request_api(current_timestamp, token, session=None, headers=None,
+                **options):
+    """Sends homework_statuses request, returns the raw response."""
     timestamp = current_timestamp or int(time.time())
     params = {'from_date': timestamp}
+    headers = {'Authorization': f'OAuth {token}', **(headers or {})}
+    if session is None:
+        import requests
+        session = requests
+    http_get = session.get
+    logging.info('Request to API sent')
+    response = http_get(ENDPOINT, headers=headers, params=params, **options)
+    API_RESPONSES.inc(status=response.status_code)
+    return response
+
+
+def check_rejected(response):
+    """Raises if the API rejected the request itself rather than failed.
+
+    Client errors such as a revoked token concern one tenant only and
+    must not be taken for the API being down. 429 is an upstream limit.
+    """
+    status = response.status_code
+    if 400 <= status < 500 and status != HTTPStatus.TOO_MANY_REQUESTS:
+        logging.error(f'API rejected the request with {status}')
+        raise APIRequestRejectedException(
+            f'API rejected the request with {status}', status)
+
+
+@timed('get_api_answer')
+def fetch_homeworks(current_timestamp, token, session=None, cache=None,
+                    decoder=None):
+    """Receives response from Yandex API on behalf of the given token.
+
+    With a cache, returns NOT_MODIFIED instead of decoding a response that
+    repeats the previous one. Decoder replaces response.json().
+    """
+    validators = cache.validators() if cache is not None else None
     try:
-        logging.info('Request to API sent')
-        response = requests.get(ENDPOINT, headers=HEADERS, params=params)
+        response = request_api(current_timestamp, token, session, validators,
+                               timeout=REQUEST_TIMEOUT)
+        if cache is not None and cache.not_modified(response):
+            logging.debug('Response not modified')
+            return NOT_MODIFIED
+        check_rejected(response)
         if response.status_code != HTTPStatus.OK:
             raise APINotRespondedException('Responce not received')
         else:
-            return response.json()
+            return decoder(response) if decoder else response.json()
     except JSONDecodeError:
         logging.error('Not json format received')
+    except APIRequestRejectedException:
+        raise
+    except Exception as error:
+        logging.error(f'API not available. {error}')
+        raise APIUnavailableException('API not available')
+
+
+@timed('get_api_answer')
+def stream_homeworks(current_timestamp, token, session=None):
+    """Receives response from Yandex API as a stream of homeworks."""
+    try:
+        response = request_api(current_timestamp, token, session,
+                               stream=True, timeout=REQUEST_TIMEOUT)
+        check_rejected(response)
+        if response.status_code != HTTPStatus.OK:
+            raise APINotRespondedException('Responce not received')
+    except APIRequestRejectedException:
+        raise
     except Exception as error:
         logging.error(f'API not available. {error}')
         raise APIUnavailableException('API not available')
+    return HomeworkStream(response.iter_content(CHUNK_SIZE))
 
 
+def get_api_answer(current_timestamp):
+    """Receives response from Yandex API."""
+    LIMITER.acquire(PRACTICUM_TOKEN)
+    return fetch_homeworks(current_timestamp, PRACTICUM_TOKEN, SESSION)
+
+
+@timed('check_response')
 def check_response(response):
     """Checking if response bears valid information."""
     if not isinstance(response, dict):
@@ -84,34 +169,171 @@ def check_response(response):
         logging.error('No new status received')
         raise KeyError('No new status received')
     homeworks = response.get('homeworks')
-    try:
-        homework = homeworks[0]
-        return homework
-    except IndexError:
-        logging.error('Empty list received')
+    if not isinstance(homeworks, list):
+        logging.error('Homeworks received are not a list')
+        raise TypeError('Homeworks received are not a list')
+    if not homeworks:
+        logging.debug('Empty list received')
+    return homeworks
 
 
-def parse_status(homework):
-    """Gets status of the homework from the information received."""
-    if 'homework_name' not in homework:
-        logging.error('No homework info')
-        raise KeyError('No homework info')
+def _parse(homework):
+    """Validates one homework record, returns ParsedHomework."""
     if not isinstance(homework, dict):
-        logging.error('Info received is not a dictionary')
         raise TypeError('Info received is not a dictionary')
+    name = homework.get('homework_name')
+    if name is None:
+        raise KeyError('No homework info')
+    status = homework.get('status')
+    suffix = MESSAGE_SUFFIXES.get(status)
+    if suffix is None:
+        raise HomeworkStatusError(f'Unknown status {status}')
+    return ParsedHomework(
+        StatusIndex.key(homework), name, status,
+        f'{MESSAGE_PREFIX}{name}{suffix}', homework.get('date_updated'))
+
+
+@timed('parse_status')
+def parse_status(homework):
+    """Gets status of the homework from the information received."""
     try:
-        homework_name = homework.get('homework_name')
-        homework_status = homework.get('status')
-        if homework_status is None or homework_status not in HOMEWORK_STATUSES:
-            logging.error('Unknown status')
-            raise HomeworkStatusError('Unknown status')
-    except Exception as error:
-        HomeworkDataError(f'Data received cant be parsed {error}')
+        return _parse(homework).message
+    except PARSE_ERRORS as error:
         logging.error(f'Data received cant be parsed {error}')
-    else:
-        verdict = HOMEWORK_STATUSES.get(homework_status)
-        logging.info('удачная отправка сообщения в Telegram')
-        return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+        raise
+
+
+@timed('parse_homeworks')
+def parse_homeworks(homeworks):
+    """Validates and parses homework records in one pass.
+
+    Returns parsed records and (homework, error) pairs of the records that
+    failed validation, so one broken record does not hide the others.
+    """
+    parsed = []
+    errors = []
+    for homework in homeworks:
+        try:
+            parsed.append(_parse(homework))
+        except PARSE_ERRORS as error:
+            logging.error(f'Data received cant be parsed {error}')
+            errors.append((homework, error))
+    return parsed, errors
+
+
+def next_cursor(response, current_timestamp):
+    """Returns from_date for the next poll taken from API current_date."""
+    current_date = response.get('current_date')
+    if isinstance(current_date, int) and current_date >= current_timestamp:
+        return current_date
+    return current_timestamp
+
+
+def apply_response(tenant, response, advance=True):
+    """Applies API payload to tenant state, returns changed homeworks."""
+    homeworks = check_response(response)
+    with tenant.lock:
+        if advance:
+            tenant.cursor = next_cursor(response, tenant.cursor)
+        tenant.checked_at = int(time.time())
+        return tenant.statuses.diff(homeworks)
+
+
+def poll_stream(tenant, session=None):
+    """Polls API for the tenant reading homeworks one by one.
+
+    Each record is compared as it arrives and only the changed ones are
+    kept. Their statuses and the cursor are committed once the whole stream
+    is read, so a connection dropped halfway leaves the tenant untouched.
+    """
+    stream = stream_homeworks(tenant.cursor, tenant.token, session)
+    staged = {}
+    try:
+        changed = list(tenant.statuses.changes(stream, staged))
+    except (KeyError, ValueError):
+        raise
+    except Exception as error:
+        logging.error(f'API not available. {error}')
+        raise APIUnavailableException('API not available')
+    with tenant.lock:
+        tenant.statuses.update(staged)
+        tenant.cursor = next_cursor(stream.fields, tenant.cursor)
+        tenant.checked_at = int(time.time())
+        return changed
+
+
+def poll_changes(tenant, session=None, breaker=None, limiter=None):
+    """Polls API for the tenant, returns homeworks with changed status."""
+    if breaker is not None:
+        return breaker.call(poll_changes, tenant, session, None, limiter)
+    if limiter is not None:
+        limiter.acquire(tenant.token)
+    if STREAM_HOMEWORKS:
+        return poll_stream(tenant, session)
+    response = fetch_homeworks(
+        tenant.cursor, tenant.token, session, tenant.cache, decode_response)
+    if response is NOT_MODIFIED:
+        tenant.checked_at = int(time.time())
+        return []
+    try:
+        return apply_response(tenant, response)
+    except Exception:
+        tenant.cache.clear()
+        raise
+
+
+def notify(coalescer, checkpoint, tenant, parsed):
+    """Queues messages about parsed changes and checkpoints the tenant."""
+    from ledger import delivery_id
+    tenant.remember(parsed)
+    for record in parsed:
+        coalescer.add(
+            tenant.chat_id, record.key, record.message,
+            delivery_id(tenant.chat_id, record))
+        logging.info('Message queued successfully')
+    if not parsed:
+        logging.debug('No new status received')
+    if checkpoint is not None:
+        checkpoint.save(tenant, parsed)
+
+
+def start_webhook(tenants, coalescer, checkpoint, **options):
+    """Starts receiver of pushed events feeding the same notify path.
+
+    Pushed events do not move the polling cursor, so the reconciliation
+    sweep still covers anything the pushes missed.
+    """
+    def handle(tenant, payload):
+        changed = apply_response(tenant, payload, advance=False)
+        parsed, _ = parse_homeworks(changed)
+        notify(coalescer, checkpoint, tenant, parsed)
+        return len(parsed)
+
+    from webhook import WebhookReceiver
+    return WebhookReceiver(tenants, handle, **options).start()
+
+
+def build_scheduler(retry_time=RETRY_TIME):
+    """Creates poll scheduler, slowed down to a sweep in webhook mode."""
+    from webhook import RECONCILE_INTERVAL, WEBHOOK_PORT
+    if WEBHOOK_PORT:
+        return PollScheduler(
+            fast=RECONCILE_INTERVAL, normal=RECONCILE_INTERVAL,
+            slow=RECONCILE_INTERVAL)
+    return PollScheduler(normal=retry_time)
+
+
+def poll_once(tenant, session, coalescer, checkpoint, scheduler,
+              breaker=None, limiter=None):
+    """Runs one iteration of the bot loop, returns delay before the next."""
+    try:
+        changed = poll_changes(tenant, session, breaker, limiter)
+        parsed, _ = parse_homeworks(changed)
+    except Exception as error:
+        logging.error(f'Сбой в работе программы: {error}')
+        return scheduler.failure(tenant, error)
+    notify(coalescer, checkpoint, tenant, parsed)
+    return scheduler.success(tenant)
 
 
 def check_tokens():
@@ -119,32 +341,163 @@ def check_tokens():
     return all((PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID))
 
 
+def read_tokens():
+    """Reads tokens from the environment, values in .env take priority.
+
+    Matches load_dotenv(override=True) at import, so a reload only changes
+    tokens that were rotated in .env.
+    """
+    tokens = {name: os.getenv(name) for name in TOKENS}
+    if os.path.exists(ENV_FILE):
+        from dotenv import dotenv_values
+        tokens.update(
+            (name, value) for name, value in dotenv_values(ENV_FILE).items()
+            if name in tokens and value)
+    return tokens
+
+
+def reload_tokens(tenant, outbox=None, make_bot=None, receiver=None,
+                  commands=None):
+    """Swaps rotated tokens in place, keeping the state of the tenant.
+
+    Returns names of the tokens that changed.
+    """
+    global PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
+    tokens = read_tokens()
+    if not all(tokens.values()):
+        logging.error('Tokens cant be validated, keeping the old ones')
+        return []
+    changed = [name for name, value in tokens.items() if TOKENS[name] != value]
+    TOKENS.update(tokens)
+    PRACTICUM_TOKEN = tokens['PRACTICUM_TOKEN']
+    TELEGRAM_TOKEN = tokens['TELEGRAM_TOKEN']
+    TELEGRAM_CHAT_ID = tokens['TELEGRAM_CHAT_ID']
+    with tenant.lock:
+        if 'PRACTICUM_TOKEN' in changed:
+            tenant.token = PRACTICUM_TOKEN
+            tenant.cache.clear()
+        tenant.chat_id = TELEGRAM_CHAT_ID
+    for server in (receiver, commands):
+        if server is not None:
+            server.route([tenant])
+    if 'TELEGRAM_TOKEN' in changed:
+        if outbox is not None and make_bot is not None:
+            outbox.bot = make_bot(TELEGRAM_TOKEN)
+        if commands is not None:
+            commands.stop()
+            commands.token = TELEGRAM_TOKEN
+            commands.start()
+    if changed:
+        logging.info(f'Tokens reloaded: {", ".join(changed)}')
+    return changed
+
+
+def serve(tenant, session, coalescer, checkpoint, scheduler, breaker,
+          shutdown, reload=None):
+    """Polls the tenant until shutdown is requested.
+
+    Tokens are reloaded on SIGHUP and when the .env file changes, which
+    is checked every ROSTER_CHECK_INTERVAL even between slow polls. Polls
+    run in a daemon thread, so one hung past the shutdown grace period
+    is abandoned instead of delaying the exit.
+    """
+    env = FileWatcher(ENV_FILE)
+    executor = DaemonExecutor(1)
+    try:
+        while not shutdown.requested:
+            if env.changed() and reload is not None:
+                reload()
+            delay = shutdown.result(executor.submit(
+                poll_once, tenant, session, coalescer, checkpoint,
+                scheduler, breaker, LIMITER))
+            if delay is None:
+                return
+            logging.debug('Next poll in %.0f s', delay)
+            planned = time.monotonic() + delay
+            if not shutdown.sleep(delay, reload, env):
+                return
+            LOOP_LAG.observe(time.monotonic() - planned)
+    finally:
+        executor.shutdown(wait=False)
+
+
 def main():
     """Основная логика работы бота."""
+    global SESSION
     if not check_tokens():
         logging.error('Tokens cant be validated')
         raise TokensValidationError('Tokens cant be validated')
     logging.info('Tokens check passed successfully')
 
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    response1 = get_api_answer(current_timestamp)
-    while True:
-        try:
-            response2 = get_api_answer(current_timestamp)
-            if response2 != response1:
-                homework = check_response(response2)
-                message = parse_status(homework)
-                response1 = response2
-        except Exception as error:
-            logging.error(f'Сбой в работе программы: {error}')
-            break
-        else:
-            send_message(bot, message)
-            logging.info('Message sent successfully')
-        finally:
-            time.sleep(RETRY_TIME)
+    import telegram
+    from checkpoint import Checkpoint
+    from circuit import CircuitBreaker
+    from coalesce import Coalescer
+    from commands import BOT_COMMANDS, CommandServer
+    from http_session import build_session
+    from ledger import DeliveryLedger
+    from outbox import Outbox
+    from recording import (
+        RECORD_FILE,
+        Recorder,
+        RecordingBot,
+        RecordingSession
+    )
+    from webhook import WEBHOOK_PORT
+    ledger = DeliveryLedger()
+    SESSION = build_session(pool_size=1)
+    recorder = None
+    if RECORD_FILE:
+        recorder = Recorder(RECORD_FILE)
+        SESSION = RecordingSession(SESSION, recorder)
+        logging.info(f'Recording traffic to {RECORD_FILE}')
+
+    def make_bot(token):
+        bot = telegram.Bot(token=token)
+        return bot if recorder is None else RecordingBot(bot, recorder)
+
+    outbox = Outbox(make_bot(TELEGRAM_TOKEN), ledger=ledger).start()
+    coalescer = Coalescer(outbox, ledger=ledger).start()
+    tenant = Tenant(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)
+    checkpoint = Checkpoint()
+    if checkpoint.restore([tenant]):
+        logging.info(f'State restored, polling from {tenant.cursor}')
+    if coalescer.requeue([tenant]):
+        logging.info('Undelivered notifications queued again')
+    scheduler = build_scheduler()
+    breaker = CircuitBreaker()
+    expose(outbox, scheduler)
+    receiver = None
+    if WEBHOOK_PORT:
+        receiver = start_webhook([tenant], coalescer, checkpoint)
+    commands = None
+    if BOT_COMMANDS:
+        commands = CommandServer(
+            [tenant], TELEGRAM_TOKEN, checkpoint).start()
+    shutdown = Shutdown().install()
+    try:
+        serve(
+            tenant, SESSION, coalescer, checkpoint, scheduler, breaker,
+            shutdown, lambda: reload_tokens(
+                tenant, outbox, make_bot, receiver, commands))
+    finally:
+        if commands is not None:
+            commands.stop()
+        if receiver is not None:
+            receiver.stop()
+        coalescer.stop()
+        if not outbox.stop(timeout=shutdown.remaining()):
+            logging.error('Очередь сообщений не отправлена до остановки')
+        checkpoint.close()
+        ledger.close()
+        if recorder is not None:
+            recorder.close()
 
 
 if __name__ == '__main__':
-    main()
+    from log_logic import setup_logging
+    listener = setup_logging()
+    try:
+        main()
+    finally:
+        listener.stop()
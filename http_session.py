@@ -0,0 +1,130 @@
+from collections import deque
+from concurrent.futures import as_completed, wait
+from metrics import HEDGED_REQUESTS
+from requests.adapters import HTTPAdapter
+from shutdown import DaemonExecutor
+from urllib3.util.retry import Retry
+
+import os
+import requests
+import threading
+import time
+
+POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+RETRIES = int(os.getenv('HTTP_RETRIES', 3))
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (502, 503, 504)
+HEDGE_REQUESTS = os.getenv('HEDGE_REQUESTS') == '1'
+HEDGE_QUANTILE = 0.95
+HEDGE_BUDGET = 0.1
+
+
+def build_session(pool_size=POOL_SIZE, retries=RETRIES, hedge=HEDGE_REQUESTS):
+    """Builds keep-alive session with a connection pool and retries.
+
+    Connect errors and 502/503/504 are retried. Read timeouts are not, so a
+    hung API holds a poll for one REQUEST_TIMEOUT and not for each retry.
+    With hedge, the session is wrapped in HedgedSession and the pool is
+    doubled to fit the hedged requests.
+    """
+    if hedge:
+        pool_size *= 2
+    retry = Retry(
+        total=retries,
+        read=0,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET']),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if hedge:
+        return HedgedSession(session, workers=pool_size)
+    return session
+
+
+class HedgedSession:
+    """Session wrapper that duplicates GET requests slower than usual.
+
+    Once min_samples latencies are known, a request still running after
+    their quantile is sent once more and the first successful response
+    wins. At most budget of all requests are hedged.
+    """
+
+    def __init__(self, session, quantile=HEDGE_QUANTILE, min_samples=20,
+                 window=200, min_delay=0.05, budget=HEDGE_BUDGET,
+                 workers=POOL_SIZE):
+        """Wraps the session, hedging once enough latencies are seen."""
+        self.session = session
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.budget = budget
+        self.requests = 0
+        self.hedged = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = DaemonExecutor(workers)
+
+    def deadline(self):
+        """Returns seconds to wait before hedging, None to not hedge."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        index = int(self.quantile * (len(latencies) - 1))
+        return max(self.min_delay, latencies[index])
+
+    def _get(self, *args, **kwargs):
+        start = time.perf_counter()
+        response = self.session.get(*args, **kwargs)
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+        return response
+
+    def get(self, *args, **kwargs):
+        """Sends GET request, hedging it when the first one is late."""
+        deadline = self.deadline()
+        with self._lock:
+            self.requests += 1
+            hedge = (deadline is not None
+                     and self.hedged < self.budget * self.requests)
+        if not hedge:
+            return self._get(*args, **kwargs)
+        first = self._executor.submit(self._get, *args, **kwargs)
+        done, _ = wait([first], timeout=deadline)
+        if done:
+            return first.result()
+        with self._lock:
+            self.hedged += 1
+        HEDGED_REQUESTS.inc()
+        futures = [first, self._executor.submit(self._get, *args, **kwargs)]
+        winner = None
+        for future in as_completed(futures):
+            if future.exception() is None:
+                winner = future
+                break
+        for future in futures:
+            if future is not winner:
+                future.add_done_callback(_discard)
+        if winner is None:
+            return first.result()
+        return winner.result()
+
+    def close(self):
+        """Closes the session and stops hedge workers."""
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+def _discard(future):
+    """Releases connection of the losing response."""
+    if future.exception() is None:
+        future.result().close()
@@ -0,0 +1,193 @@
+from checkpoint import CHECKPOINT_FILE
+
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+LEDGER_TTL = int(os.getenv('LEDGER_TTL', 30 * 24 * 3600))
+LEDGER_CAPACITY = int(os.getenv('LEDGER_CAPACITY', 1000000))
+FALSE_POSITIVE_RATE = 0.001
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS deliveries (
+    delivery_id BLOB PRIMARY KEY,
+    delivered_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deliveries_age ON deliveries (delivered_at);
+CREATE TABLE IF NOT EXISTS pending (
+    chat_id TEXT NOT NULL,
+    homework_key TEXT NOT NULL,
+    delivery_id BLOB NOT NULL,
+    message TEXT NOT NULL,
+    queued_at REAL NOT NULL,
+    PRIMARY KEY (chat_id, homework_key)
+);
+CREATE INDEX IF NOT EXISTS pending_delivery ON pending (delivery_id);
+'''
+
+
+def delivery_id(chat_id, record):
+    """Returns idempotency key of a notification about a parsed record."""
+    identity = json.dumps(
+        [str(chat_id), record.key, record.status, record.updated])
+    return hashlib.blake2b(identity.encode(), digest_size=16).digest()
+
+
+class BloomFilter:
+    """Fixed size set of byte strings answering 'maybe' or 'no'."""
+
+    def __init__(self, capacity, error_rate=FALSE_POSITIVE_RATE):
+        """Sizes the filter for capacity items at error_rate."""
+        self.size = max(8, math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        for number in range(self.hashes):
+            yield (first + number * second) % self.size
+
+    def add(self, item):
+        """Adds the item."""
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        """Returns True if the item was probably added."""
+        return all(
+            self.bits[position >> 3] & 1 << (position & 7)
+            for position in self._positions(item))
+
+
+class DeliveryLedger:
+    """Delivered notifications, checked before a send and committed after.
+
+    Deliveries are stored in SQLite and forgotten after ttl seconds. Two
+    bloom filters, rotated every ttl and sized for capacity deliveries
+    each, answer most lookups in memory: an id absent from both was never
+    delivered. Only 'maybe' answers go to the database, so a false
+    positive never suppresses a notification.
+
+    The filters only know deliveries of this process. Requeued pending
+    notifications are always confirmed in the database, as another process
+    sharing the file may have sent them, and with shared every lookup is.
+    """
+
+    def __init__(self, path=CHECKPOINT_FILE, ttl=LEDGER_TTL,
+                 capacity=LEDGER_CAPACITY, clock=time.time, shared=False):
+        """Opens the ledger table and fills the filters from it."""
+        self.ttl = ttl
+        self.capacity = capacity
+        self.clock = clock
+        self.shared = shared
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._previous = BloomFilter(1)
+        self._current = BloomFilter(capacity)
+        self._rotated_at = clock()
+        self._requeued = set()
+        self._load()
+
+    def _load(self):
+        """Fills the filter from deliveries still within ttl."""
+        rows = self.connection.execute(
+            'SELECT delivery_id FROM deliveries WHERE delivered_at >= ?',
+            (self.clock() - self.ttl,))
+        for delivery, in rows:
+            self._current.add(delivery)
+
+    def _rotate(self):
+        """Starts a new filter generation and evicts expired deliveries."""
+        now = self.clock()
+        if now - self._rotated_at < self.ttl:
+            return
+        self._previous = self._current
+        self._current = BloomFilter(self.capacity)
+        self._rotated_at = now
+        with self.connection:
+            evicted = self.connection.execute(
+                'DELETE FROM deliveries WHERE delivered_at < ?',
+                (now - self.ttl,)).rowcount
+            self.connection.execute(
+                'DELETE FROM pending WHERE queued_at < ?', (now - self.ttl,))
+        logging.debug(f'Delivery ledger rotated, {evicted} evicted')
+
+    def seen(self, delivery):
+        """Checks whether the notification was already delivered."""
+        with self._lock:
+            if (not self.shared and delivery not in self._requeued
+                    and delivery not in self._current
+                    and delivery not in self._previous):
+                return False
+            row = self.connection.execute(
+                'SELECT delivered_at FROM deliveries WHERE delivery_id = ?',
+                (delivery,)).fetchone()
+            seen = row is not None and row[0] >= self.clock() - self.ttl
+            if seen:
+                self._requeued.discard(delivery)
+        return seen
+
+    def expect(self, chat_id, key, message, delivery):
+        """Remembers a queued notification until it is delivered.
+
+        Only the latest notification about a homework is kept, so an
+        intermediate status replaced in the queue is never sent later.
+        """
+        with self._lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO pending VALUES (?, ?, ?, ?, ?)',
+                (str(chat_id), json.dumps(key), delivery, message,
+                 self.clock()))
+
+    def pending(self, chat_ids):
+        """Returns notifications queued for the chats but not delivered.
+
+        Items are (chat_id, homework key, message, delivery id), with
+        chat_id as a string.
+        """
+        chats = {str(chat_id) for chat_id in chat_ids}
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT chat_id, homework_key, message, delivery_id '
+                'FROM pending WHERE queued_at >= ? ORDER BY queued_at',
+                (self.clock() - self.ttl,)).fetchall()
+            found = [
+                (chat_id, json.loads(key), message, delivery)
+                for chat_id, key, message, delivery in rows
+                if chat_id in chats
+            ]
+            self._requeued.update(delivery for *_, delivery in found)
+        return found
+
+    def commit(self, deliveries):
+        """Records notifications as delivered."""
+        now = self.clock()
+        with self._lock:
+            self._rotate()
+            for delivery in deliveries:
+                self._current.add(delivery)
+            self._requeued.difference_update(deliveries)
+            with self.connection:
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO deliveries VALUES (?, ?)',
+                    [(delivery, now) for delivery in deliveries])
+                self.connection.executemany(
+                    'DELETE FROM pending WHERE delivery_id = ?',
+                    [(delivery,) for delivery in deliveries])
+
+    def close(self):
+        """Closes the database connection."""
+        self.connection.close()
@@ -0,0 +1,64 @@
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+import json
+import logging
+import os
+import queue
+import sys
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FILE = os.getenv('LOG_FILE')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 50000000))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record):
+        """Returns record serialized to JSON."""
+        data = {
+            'time': self.formatTime(record),
+            'logger': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+def build_handlers(filename=LOG_FILE, json_format=LOG_FORMAT == 'json'):
+    """Creates stdout and optional rotating file handlers."""
+    formatter = JsonFormatter() if json_format else logging.Formatter(
+        TEXT_FORMAT)
+    handlers = [logging.StreamHandler(stream=sys.stdout)]
+    if filename:
+        handlers.append(RotatingFileHandler(
+            filename, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+            encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def setup_logging(level=LOG_LEVEL, handlers=None):
+    """Routes root logger through a queue, returns the started listener.
+
+    The calling thread only puts records on the queue, formatting and I/O
+    happen in the listener thread. Stop the listener on exit to flush it.
+    """
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+    listener = QueueListener(
+        log_queue, *(handlers or build_handlers()),
+        respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,243 @@
+from bisect import bisect_left
+from functools import wraps
+
+import os
+import threading
+import time
+
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REGISTRY = []
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    inner = ','.join(f'{name}="{value}"' for name, value in pairs)
+    return '{' + inner + '}'
+
+
+class Metric:
+    """Base of the metric types rendered in Prometheus text format."""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation):
+        """Names the metric for the exposition format."""
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def render(self):
+        """Returns the metric as lines of Prometheus exposition format."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+    def _samples(self):
+        return [
+            f'{self.name}{_format_labels(key)} {value}'
+            for key, value in self._values.items()
+        ]
+
+
+class Counter(Metric):
+    """Monotonically growing count."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """Adds amount to the counter with given labels."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Returns current value of the counter with given labels."""
+        return self._values.get(_label_key(labels), 0)
+
+
+class Gauge(Metric):
+    """Value that goes up and down, or is read from a callback."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation):
+        """Names the gauge, values are set or read from functions."""
+        super().__init__(name, documentation)
+        self._functions = {}
+
+    def set(self, value, **labels):
+        """Sets the gauge with given labels."""
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def set_function(self, function, **labels):
+        """Reads the gauge from function at scrape time."""
+        with self._lock:
+            self._functions[_label_key(labels)] = function
+
+    def _samples(self):
+        for key, function in self._functions.items():
+            self._values[key] = function()
+        return super()._samples()
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        """Names the histogram with upper bounds of its buckets."""
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        """Records one observation with given labels."""
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        """Returns number of observations with given labels."""
+        series = self._values.get(_label_key(labels))
+        return series[2] if series else 0
+
+    def _samples(self):
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket
+                labels = _format_labels(key, [('le', bound)])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {count}')
+        return lines
+
+
+CALL_DURATION = Histogram(
+    'homework_call_duration_seconds',
+    'Duration of poll/notify pipeline calls')
+CALL_ERRORS = Counter(
+    'homework_call_errors_total',
+    'Exceptions raised by poll/notify pipeline calls')
+API_RESPONSES = Counter(
+    'homework_api_responses_total',
+    'Practicum API responses by HTTP status')
+MESSAGES_SENT = Counter(
+    'homework_messages_sent_total',
+    'Telegram messages delivered')
+MESSAGE_LATENCY = Histogram(
+    'homework_message_latency_seconds',
+    'Time from queueing a Telegram message to its delivery')
+LOOP_LAG = Histogram(
+    'homework_loop_lag_seconds',
+    'Delay between planned and actual poll start')
+QUEUE_DEPTH = Gauge(
+    'homework_outbox_depth',
+    'Telegram messages waiting to be sent')
+REQUEST_RATE = Gauge(
+    'homework_request_rate',
+    'Planned Practicum API requests per second')
+CIRCUIT_STATE = Gauge(
+    'homework_circuit_state',
+    'Practicum API circuit breaker state: 0 closed, 1 half-open, 2 open')
+HEDGED_REQUESTS = Counter(
+    'homework_hedged_requests_total',
+    'Practicum API requests duplicated after the hedge deadline')
+SHARD_SIZE = Gauge(
+    'homework_shard_tenants',
+    'Tenants polled by the worker')
+RATE_LIMIT_UTILIZATION = Gauge(
+    'homework_rate_limit_utilization',
+    'Share of the Practicum API rate limit used over the last minute')
+RATE_LIMIT_WAIT = Histogram(
+    'homework_rate_limit_wait_seconds',
+    'Time a Practicum API request waited for the rate limiter')
+
+
+def timed(function_name):
+    """Records duration and exceptions of the decorated function."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception as error:
+                CALL_ERRORS.inc(
+                    function=function_name,
+                    exception=type(error).__name__)
+                raise
+            finally:
+                CALL_DURATION.observe(
+                    time.perf_counter() - start, function=function_name)
+        return wrapper
+    return decorator
+
+
+def render():
+    """Returns every registered metric in Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def serve(port=METRICS_PORT, host='0.0.0.0'):
+    """Starts the metrics endpoint in a background thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Serves /metrics for Prometheus scrapes."""
+
+        def do_GET(self):
+            """Returns current metrics."""
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            """Keeps scrapes out of the bot log."""
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def expose(outbox, scheduler, port=METRICS_PORT):
+    """Binds bot state gauges and serves metrics when port is configured."""
+    QUEUE_DEPTH.set_function(outbox.depth)
+    REQUEST_RATE.set_function(scheduler.request_rate)
+    if port:
+        return serve(port)
+    return None
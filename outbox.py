@@ -0,0 +1,223 @@
+from metrics import CALL_ERRORS, MESSAGE_LATENCY, MESSAGES_SENT
+from telegram.error import RetryAfter
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+PER_CHAT_INTERVAL = float(os.getenv('TELEGRAM_PER_CHAT_INTERVAL', 1.0))
+GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 1.0
+
+
+class Envelope:
+    """Message waiting in the outbox."""
+
+    __slots__ = ('chat_id', 'text', 'enqueued_at', 'attempts', 'deliveries')
+
+    def __init__(self, chat_id, text, enqueued_at, deliveries=()):
+        """Wraps the message with the time it was queued."""
+        self.chat_id = chat_id
+        self.text = text
+        self.enqueued_at = enqueued_at
+        self.attempts = 0
+        self.deliveries = deliveries
+
+
+class Outbox:
+    """Background Telegram sender respecting per-chat and global limits.
+
+    Exposes the same send_message(chat_id, text) as telegram.Bot, so it can
+    be passed wherever the bot is expected and polling never waits for
+    Telegram. Messages carrying delivery_ids are checked against the
+    ledger right before sending and committed to it once sent.
+    """
+
+    def __init__(self, bot, workers=1, per_chat_interval=PER_CHAT_INTERVAL,
+                 global_rate=GLOBAL_RATE, max_attempts=MAX_ATTEMPTS,
+                 retry_delay=RETRY_DELAY, clock=time.monotonic, ledger=None):
+        """Prepares the outbox, call start() to begin sending."""
+        self.bot = bot
+        self.ledger = ledger
+        self.per_chat_interval = per_chat_interval
+        self.global_interval = 1 / global_rate
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.clock = clock
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._chat_ready = {}
+        self._global_ready = 0.0
+        self._in_flight = 0
+        self._stopping = False
+        self._threads = [
+            threading.Thread(target=self._work, daemon=True)
+            for _ in range(workers)
+        ]
+        self.sent = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def send_message(self, chat_id, text, delivery_ids=(), **kwargs):
+        """Queues message for delivery and returns immediately."""
+        envelope = Envelope(chat_id, text, self.clock(), tuple(delivery_ids))
+        with self._condition:
+            self._push(envelope, envelope.enqueued_at)
+            self._condition.notify_all()
+
+    def _push(self, envelope, ready_at):
+        heapq.heappush(self._heap, (ready_at, next(self._sequence), envelope))
+
+    def _take(self):
+        """Waits for a message that may be sent now and reserves its slot."""
+        with self._condition:
+            while True:
+                if self._stopping and not self._heap:
+                    return None
+                now = self.clock()
+                if self._heap and self._heap[0][0] <= now:
+                    ready_at, _, envelope = heapq.heappop(self._heap)
+                    allowed = max(
+                        self._chat_ready.get(envelope.chat_id, 0.0),
+                        self._global_ready)
+                    if allowed <= now:
+                        self._chat_ready[envelope.chat_id] = (
+                            now + self.per_chat_interval)
+                        self._global_ready = now + self.global_interval
+                        self._in_flight += 1
+                        return envelope
+                    self._push(envelope, allowed)
+                    continue
+                timeout = self._heap[0][0] - now if self._heap else None
+                self._condition.wait(timeout)
+
+    def _failed(self, envelope, error):
+        """Counts a failed attempt, returns when to retry or None."""
+        CALL_ERRORS.inc(function='telegram', exception=type(error).__name__)
+        logging.error(f'Cбой при отправке сообщения в Telegram {error}')
+        if envelope.attempts >= self.max_attempts:
+            self.failed += 1
+            return None
+        return self.clock() + self.retry_delay * 2 ** envelope.attempts
+
+    def _flood_wait(self, envelope, error):
+        """Holds every chat for retry_after, the limit is per bot."""
+        CALL_ERRORS.inc(function='telegram', exception='RetryAfter')
+        retry_at = self.clock() + error.retry_after
+        with self._condition:
+            self._global_ready = max(self._global_ready, retry_at)
+        if envelope.attempts >= self.max_attempts:
+            logging.error(
+                f'Telegram просит подождать {error.retry_after} с, '
+                'попытки исчерпаны')
+            self.failed += 1
+            return None
+        return retry_at
+
+    def _deliver(self, envelope):
+        """Sends message, requeueing it when Telegram asks to retry."""
+        ledger = self.ledger if envelope.deliveries else None
+        if ledger is not None and all(map(ledger.seen, envelope.deliveries)):
+            self.duplicates += 1
+            logging.info('Уведомление уже было отправлено, пропускаем')
+            return None
+        envelope.attempts += 1
+        try:
+            self.bot.send_message(envelope.chat_id, envelope.text)
+        except RetryAfter as error:
+            return self._flood_wait(envelope, error)
+        except Exception as error:
+            return self._failed(envelope, error)
+        if ledger is not None:
+            try:
+                ledger.commit(envelope.deliveries)
+            except Exception as error:
+                logging.error(f'Доставка не записана в журнал: {error}')
+        latency = self.clock() - envelope.enqueued_at
+        self.sent += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        MESSAGES_SENT.inc()
+        MESSAGE_LATENCY.observe(latency)
+        logging.info('удачная отправка сообщения в Telegram')
+        return None
+
+    def _work(self):
+        while True:
+            envelope = self._take()
+            if envelope is None:
+                return
+            try:
+                retry_at = self._deliver(envelope)
+            except Exception as error:
+                envelope.attempts += 1
+                retry_at = self._failed(envelope, error)
+            with self._condition:
+                self._in_flight -= 1
+                if retry_at is not None:
+                    self._chat_ready[envelope.chat_id] = retry_at
+                    self._push(envelope, retry_at)
+                self._condition.notify_all()
+
+    def start(self):
+        """Starts sender threads."""
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def flush(self, timeout=None):
+        """Waits until every queued message is handled, returns success."""
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._condition:
+            while self._heap or self._in_flight:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        return False
+                self._condition.wait(remaining)
+        return True
+
+    def stop(self, timeout=None):
+        """Drains the queue within timeout and stops sender threads.
+
+        The timeout bounds the whole call, a sender stuck in Telegram is
+        left behind as a daemon thread.
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        drained = self.flush(timeout)
+        with self._condition:
+            self._stopping = True
+            if self._heap:
+                logging.error(f'{len(self._heap)} messages were not sent')
+            self._heap.clear()
+            self._condition.notify_all()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join(
+                    None if deadline is None
+                    else max(deadline - self.clock(), 0))
+        return drained
+
+    def depth(self):
+        """Returns number of messages waiting to be sent."""
+        with self._condition:
+            return len(self._heap) + self._in_flight
+
+    def stats(self):
+        """Returns queue depth and send latency counters."""
+        return {
+            'depth': self.depth(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'duplicates': self.duplicates,
+            'latency_avg': self.latency_total / self.sent if self.sent else 0,
+            'latency_max': self.latency_max,
+        }
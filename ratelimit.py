@@ -0,0 +1,134 @@
+from collections import deque
+from metrics import RATE_LIMIT_UTILIZATION, RATE_LIMIT_WAIT
+
+import os
+import threading
+import time
+
+API_RATE = float(os.getenv('API_RATE', 10))
+API_BURST = float(os.getenv('API_BURST', 10))
+API_TOKEN_RATE = float(os.getenv('API_TOKEN_RATE', 1))
+API_TOKEN_BURST = float(os.getenv('API_TOKEN_BURST', 10))
+UTILIZATION_WINDOW = 60
+
+
+class TokenBucket:
+    """Token bucket handing out reservations instead of refusals."""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        """Starts with a full bucket."""
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def reserve(self, now):
+        """Takes a token, returns seconds until it may be used."""
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def full(self, now):
+        """Tells whether the bucket has refilled, same as a new one."""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class RateLimiter:
+    """Limits Practicum API requests globally and per Practicum token.
+
+    Callers take a reservation and wait for it outside the lock, with
+    acquire() in threads or acquire_async() in the event loop.
+    """
+
+    def __init__(self, rate=API_RATE, burst=API_BURST,
+                 token_rate=API_TOKEN_RATE, token_burst=API_TOKEN_BURST,
+                 clock=time.monotonic, sleep=time.sleep):
+        """Sets global and per token rates in requests per second."""
+        self.rate = rate
+        self.burst = burst
+        self.share = 1
+        self.token_rate = token_rate
+        self.token_burst = token_burst
+        self.clock = clock
+        self.sleep = sleep
+        self._global = TokenBucket(rate, burst, clock())
+        self._buckets = {}
+        self._granted = deque()
+        self._swept = clock()
+        self._lock = threading.Lock()
+        RATE_LIMIT_UTILIZATION.set_function(self.utilization)
+
+    def divide(self, share):
+        """Keeps 1/share of the global rate, for one of share processes.
+
+        Per token limits are kept whole: a token is polled by one process.
+        """
+        share = max(int(share), 1)
+        now = self.clock()
+        with self._lock:
+            bucket = self._global
+            bucket.tokens = min(
+                bucket.burst,
+                bucket.tokens + (now - bucket.updated) * bucket.rate)
+            bucket.updated = now
+            bucket.rate = self.rate / share
+            bucket.burst = max(self.burst / share, 1)
+            bucket.tokens = min(bucket.tokens, bucket.burst)
+            self.share = share
+
+    def reserve(self, token):
+        """Reserves one request for the token, returns the wait."""
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(token)
+            if bucket is None:
+                bucket = self._buckets[token] = TokenBucket(
+                    self.token_rate, self.token_burst, now)
+            delay = max(self._global.reserve(now), bucket.reserve(now))
+            self._granted.append(now + delay)
+            self._expire(now)
+        RATE_LIMIT_WAIT.observe(delay)
+        return delay
+
+    def _expire(self, now):
+        """Drops grants older than the window and refilled token buckets.
+
+        Buckets of idle, removed or rotated tokens are swept once per window;
+        a refilled bucket is the same as the one a new request would create.
+        """
+        since = now - UTILIZATION_WINDOW
+        while self._granted and self._granted[0] < since:
+            self._granted.popleft()
+        if now - self._swept < UTILIZATION_WINDOW:
+            return
+        self._swept = now
+        for token, bucket in list(self._buckets.items()):
+            if bucket.full(now):
+                del self._buckets[token]
+
+    def acquire(self, token):
+        """Blocks until a request for the token is allowed."""
+        delay = self.reserve(token)
+        if delay:
+            self.sleep(delay)
+        return delay
+
+    async def acquire_async(self, token):
+        """Waits in the event loop until a request is allowed."""
+        import asyncio
+        delay = self.reserve(token)
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+    def utilization(self):
+        """Returns share of the global rate used over the last minute."""
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            granted = sum(1 for moment in self._granted if moment <= now)
+        return granted / (self._global.rate * UTILIZATION_WINDOW)
@@ -0,0 +1,304 @@
+from bisect import bisect_right
+from collections import namedtuple
+from decoding import CHUNK_SIZE
+from http import HTTPStatus
+from state import StatusIndex
+
+import gzip
+import hashlib
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+
+RECORD_FILE = os.getenv('RECORD_FILE')
+FLUSH_INTERVAL = 1.0
+
+
+def pseudonym(value):
+    """Returns stable short name of a token or chat that hides its value."""
+    return hashlib.blake2b(str(value).encode(), digest_size=6).hexdigest()
+
+
+class Recorder:
+    """Appends API responses and Telegram calls to a gzipped JSON lines log.
+
+    Tokens and chat ids are replaced by pseudonyms, so the log can be
+    shared to reproduce an incident.
+    """
+
+    def __init__(self, path=RECORD_FILE, clock=time.time):
+        """Opens the log for appending."""
+        self.clock = clock
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._flushed_at = clock()
+        self.events = 0
+
+    def write(self, kind, **fields):
+        """Appends one event."""
+        now = self.clock()
+        line = json.dumps(
+            {'t': now, 'kind': kind, **fields}, ensure_ascii=False,
+            separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self.events += 1
+            if now - self._flushed_at >= FLUSH_INTERVAL:
+                self._file.flush()
+                self._flushed_at = now
+
+    def close(self):
+        """Flushes and closes the log."""
+        with self._lock:
+            self._file.close()
+
+
+class RecordingSession:
+    """Session wrapper writing every API response to the recorder."""
+
+    def __init__(self, session, recorder):
+        """Wraps the session."""
+        self.session = session
+        self.recorder = recorder
+
+    def get(self, url, headers=None, params=None, **options):
+        """Sends GET request through the session and records its outcome."""
+        token = (headers or {}).get('Authorization', '')[len('OAuth '):]
+        fields = {
+            'tenant': pseudonym(token),
+            'from_date': (params or {}).get('from_date'),
+        }
+        try:
+            response = self.session.get(
+                url, headers=headers, params=params, **options)
+        except Exception as error:
+            self.recorder.write('api', error=type(error).__name__, **fields)
+            raise
+        self.recorder.write(
+            'api', status=response.status_code,
+            body=response.content.decode('utf-8', 'replace'), **fields)
+        return response
+
+    def close(self):
+        """Closes the wrapped session."""
+        self.session.close()
+
+
+class RecordingBot:
+    """Bot wrapper writing every sent message to the recorder."""
+
+    def __init__(self, bot, recorder):
+        """Wraps the bot."""
+        self.bot = bot
+        self.recorder = recorder
+
+    def send_message(self, chat_id, text, **kwargs):
+        """Sends the message and records it once sent."""
+        result = self.bot.send_message(chat_id, text, **kwargs)
+        self.recorder.write('telegram', chat=pseudonym(chat_id), text=text)
+        return result
+
+
+def read_log(path):
+    """Yields events of a recorded log."""
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class VirtualClock:
+    """Clock that jumps over sleeps, slowed down to factor x real time."""
+
+    def __init__(self, start, factor=None):
+        """Starts the clock at start, factor None never sleeps."""
+        self.now = start
+        self.factor = factor
+
+    def time(self):
+        """Returns current virtual time."""
+        return self.now
+
+    def sleep(self, delay):
+        """Advances virtual time by delay."""
+        if self.factor:
+            time.sleep(delay / self.factor)
+        self.now += delay
+
+
+class ReplayResponse:
+    """Recorded API response."""
+
+    def __init__(self, status_code, body):
+        """Keeps the recorded status and body."""
+        self.status_code = status_code
+        self.content = body.encode()
+        self.headers = {}
+
+    def json(self):
+        """Decodes the body."""
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=CHUNK_SIZE):
+        """Yields the body in chunks."""
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+
+class ReplaySession:
+    """Serves every request with the response recorded last before it.
+
+    The tenant is taken from the Authorization header, which during a
+    replay carries the pseudonym of the recorded token.
+    """
+
+    def __init__(self, events, clock):
+        """Indexes recorded API events by tenant and time."""
+        self.clock = clock
+        self._times = {}
+        self._events = {}
+        for event in events:
+            self._times.setdefault(event['tenant'], []).append(event['t'])
+            self._events.setdefault(event['tenant'], []).append(event)
+
+    def get(self, url, headers=None, params=None, **options):
+        """Returns recorded response of the tenant at the virtual time."""
+        import requests
+        tenant = headers['Authorization'][len('OAuth '):]
+        index = max(bisect_right(self._times[tenant], self.clock.now) - 1, 0)
+        event = self._events[tenant][index]
+        if 'error' in event:
+            raise requests.ConnectionError(event['error'])
+        return ReplayResponse(event['status'], event['body'])
+
+
+Delivery = namedtuple('Delivery', ('at', 'chat_id', 'key', 'status'))
+
+
+class ReplayCoalescer:
+    """Collects notifications with the virtual time they were queued at."""
+
+    def __init__(self, tenants, clock):
+        """Starts with no deliveries."""
+        self.tenants = tenants
+        self.clock = clock
+        self.deliveries = []
+
+    def add(self, chat_id, key, message, delivery_id=None):
+        """Records the notification."""
+        status = self.tenants[chat_id].statuses.get(key)
+        self.deliveries.append(Delivery(self.clock.now, chat_id, key, status))
+
+
+def status_changes(events):
+    """Returns {(tenant, homework key): [(time, status), ...]} of changes."""
+    changes = {}
+    for event in events:
+        if event.get('status') != HTTPStatus.OK:
+            continue
+        try:
+            homeworks = json.loads(event['body'])['homeworks']
+        except (ValueError, KeyError, TypeError):
+            continue
+        for homework in homeworks:
+            if not isinstance(homework, dict):
+                continue
+            history = changes.setdefault(
+                (event['tenant'], StatusIndex.key(homework)), [])
+            status = homework.get('status')
+            if not history or history[-1][1] != status:
+                history.append((event['t'], status))
+    return changes
+
+
+def detection_latency(delivery, changes):
+    """Returns time from the recorded status change to its notification."""
+    history = changes.get((delivery.chat_id, delivery.key), [])
+    index = bisect_right([moment for moment, _ in history], delivery.at) - 1
+    if index < 0 or history[index][1] != delivery.status:
+        return None
+    return delivery.at - history[index][0]
+
+
+def percentile(values, fraction):
+    """Returns value at fraction of the sorted values."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def replay(path, factor=None, retry_time=None):
+    """Runs the bot loop over a recorded log on a virtual clock.
+
+    Every tenant of the log is polled by poll_once(), the same iteration
+    main() runs, with sleeps jumping the virtual clock. Returns a report
+    of throughput, messages and detection latency: time between a status
+    first appearing in a recorded response and its notification.
+    """
+    import homework
+    from circuit import CircuitBreaker
+    from scheduler import PollScheduler
+    from tenants import Tenant
+
+    events = list(read_log(path))
+    api = sorted(
+        (event for event in events if event['kind'] == 'api'),
+        key=lambda event: event['t'])
+    if not api:
+        raise ValueError(f'No API responses recorded in {path}')
+    clock = VirtualClock(api[0]['t'], factor)
+    tenants = {}
+    queue = []
+    for event in api:
+        if event['tenant'] not in tenants:
+            tenant = tenants[event['tenant']] = Tenant(
+                event['tenant'], event['tenant'],
+                cursor=event['from_date'] or int(event['t']))
+            queue.append((event['t'], len(queue), tenant))
+    session = ReplaySession(api, clock)
+    coalescer = ReplayCoalescer(tenants, clock)
+    scheduler = PollScheduler(
+        normal=retry_time or homework.RETRY_TIME, clock=clock.time)
+    breaker = CircuitBreaker(clock=clock.time)
+    end = api[-1]['t']
+    polls = 0
+    started = time.perf_counter()
+    logger = logging.getLogger()
+    level = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        while queue and queue[0][0] <= end:
+            at, index, tenant = heapq.heappop(queue)
+            clock.sleep(at - clock.now)
+            delay = homework.poll_once(
+                tenant, session, coalescer, None, scheduler, breaker)
+            polls += 1
+            heapq.heappush(queue, (clock.now + delay, index, tenant))
+    finally:
+        logger.setLevel(level)
+    elapsed = time.perf_counter() - started
+    changes = status_changes(api)
+    latencies = [
+        latency for latency in (
+            detection_latency(delivery, changes)
+            for delivery in coalescer.deliveries)
+        if latency is not None
+    ]
+    return {
+        'tenants': len(tenants),
+        'recorded_requests': len(api),
+        'recorded_messages': sum(
+            event['kind'] == 'telegram' for event in events),
+        'polls': polls,
+        'messages': len(coalescer.deliveries),
+        'virtual_seconds': end - api[0]['t'],
+        'real_seconds': elapsed,
+        'polls_per_second': polls / elapsed if elapsed else 0.0,
+        'latency_p50': percentile(latencies, 0.5),
+        'latency_p99': percentile(latencies, 0.99),
+        'latency_max': max(latencies, default=0.0),
+    }
@@ -0,0 +1,85 @@
+from exceptions import (
+    APINotRespondedException,
+    APIUnavailableException,
+    CircuitOpenException
+)
+
+import os
+import random
+import time
+
+FAST_INTERVAL = int(os.getenv('FAST_INTERVAL', 60))
+NORMAL_INTERVAL = int(os.getenv('NORMAL_INTERVAL', 600))
+SLOW_INTERVAL = int(os.getenv('SLOW_INTERVAL', 1800))
+MAX_BACKOFF = int(os.getenv('MAX_BACKOFF', 3600))
+JITTER = 0.1
+
+RETRYABLE_ERRORS = (APIUnavailableException, APINotRespondedException)
+
+
+class PollScheduler:
+    """Picks the next poll time of every tenant from its state."""
+
+    def __init__(self, fast=FAST_INTERVAL, normal=NORMAL_INTERVAL,
+                 slow=SLOW_INTERVAL, max_backoff=MAX_BACKOFF,
+                 jitter=JITTER, clock=time.time):
+        """Sets poll intervals in seconds."""
+        self.fast = fast
+        self.normal = normal
+        self.slow = slow
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.clock = clock
+        self._failures = {}
+        self._schedule = {}
+
+    def interval(self, tenant):
+        """Returns polling interval matching the tenant homework statuses."""
+        statuses = [status for _, status in tenant.statuses.items()]
+        if 'reviewing' in statuses:
+            return self.fast
+        if statuses and all(status == 'approved' for status in statuses):
+            return self.slow
+        return self.normal
+
+    def _plan(self, tenant, delay):
+        """Remembers when the tenant is polled next, returns the delay."""
+        self._schedule[tenant.chat_id] = (self.clock() + delay, delay)
+        return delay
+
+    def success(self, tenant):
+        """Returns delay before the next poll after a successful one."""
+        self._failures.pop(tenant.chat_id, None)
+        delay = self.interval(tenant)
+        delay += random.uniform(0, delay * self.jitter)
+        return self._plan(tenant, delay)
+
+    def failure(self, tenant, error):
+        """Returns delay before the next poll after a failed one."""
+        if not isinstance(error, RETRYABLE_ERRORS):
+            return self._plan(tenant, self.normal)
+        if isinstance(error, CircuitOpenException):
+            delay = error.retry_after
+            return self._plan(
+                tenant, delay + random.uniform(0, self.fast * self.jitter))
+        failures = self._failures.get(tenant.chat_id, 0) + 1
+        self._failures[tenant.chat_id] = failures
+        backoff = min(self.max_backoff, self.fast * 2 ** failures)
+        return self._plan(tenant, random.uniform(backoff / 2, backoff))
+
+    def forget(self, tenant):
+        """Drops the tenant from the schedule."""
+        self._failures.pop(tenant.chat_id, None)
+        self._schedule.pop(tenant.chat_id, None)
+
+    def schedule(self):
+        """Returns {chat_id: next poll timestamp} for every tenant."""
+        return {
+            chat_id: next_time
+            for chat_id, (next_time, _) in self._schedule.items()
+        }
+
+    def request_rate(self):
+        """Returns the effective number of API requests per second."""
+        return sum(
+            1 / delay for _, delay in self._schedule.values() if delay > 0)
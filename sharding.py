@@ -0,0 +1,283 @@
+from bisect import bisect
+from engine import ROSTER_FILE, TELEGRAM_TOKEN, PollingEngine
+from exceptions import TokensValidationError
+from metrics import METRICS_PORT, SHARD_SIZE
+from shutdown import SHUTDOWN_TIMEOUT
+from tenants import FileWatcher, load_roster
+from webhook import WEBHOOK_PORT
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+WORKER_COUNT = int(os.getenv('WORKER_COUNT', 0)) or os.cpu_count()
+WORKER_INDEX = os.getenv('WORKER_INDEX')
+REPLICAS = 100
+SHARD_CHECK_INTERVAL = 1
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to nodes.
+
+    Every node owns replicas points on the ring, so adding or removing a
+    node moves only the keys of its neighbouring arcs.
+    """
+
+    def __init__(self, nodes=(), replicas=REPLICAS):
+        """Places every node on the ring replicas times."""
+        self.replicas = replicas
+        self._points = []
+        self._nodes = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def hash(value):
+        """Returns position of the value on the ring."""
+        digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    def add(self, node):
+        """Places the node on the ring."""
+        for replica in range(self.replicas):
+            point = self.hash(f'{node}:{replica}')
+            self._nodes[point] = node
+        self._points = sorted(self._nodes)
+
+    def remove(self, node):
+        """Takes the node off the ring."""
+        for replica in range(self.replicas):
+            self._nodes.pop(self.hash(f'{node}:{replica}'), None)
+        self._points = sorted(self._nodes)
+
+    def node(self, key):
+        """Returns the node owning the key."""
+        if not self._points:
+            raise LookupError('Hash ring is empty')
+        index = bisect(self._points, self.hash(key)) % len(self._points)
+        return self._nodes[self._points[index]]
+
+
+def shard(tenants, index, count, replicas=REPLICAS):
+    """Returns tenants owned by worker index out of count workers."""
+    ring = HashRing(range(count), replicas)
+    return [tenant for tenant in tenants if ring.node(tenant.chat_id) == index]
+
+
+def dyno_index(dyno=None):
+    """Returns worker index of a Heroku dyno named like sharded.3."""
+    dyno = dyno or os.getenv('DYNO', '')
+    _, _, number = dyno.rpartition('.')
+    return int(number) - 1 if number.isdigit() else None
+
+
+async def follow_shard(engine, index, workers,
+                       interval=SHARD_CHECK_INTERVAL):
+    """Reassigns tenants and the API rate when worker count changes."""
+    count = workers.value
+    while True:
+        await asyncio.sleep(interval)
+        if workers.value == count:
+            continue
+        count = workers.value
+        if engine.limiter is not None:
+            engine.limiter.divide(count)
+        added, removed = engine.assign(engine.owned())
+        logging.info(
+            f'Worker {index} of {count}: +{len(added)} -{len(removed)}, '
+            f'owns {len(engine.tenants)} tenants')
+
+
+async def serve_shard(index, workers, roster_file=ROSTER_FILE):
+    """Polls the slice of the roster owned by worker index."""
+    import telegram
+    from checkpoint import Checkpoint
+    from ledger import DeliveryLedger
+    tenants = load_roster(roster_file)
+    checkpoint = Checkpoint()
+    ledger = DeliveryLedger(shared=True)
+    engine = PollingEngine(
+        tenants, telegram.Bot(token=TELEGRAM_TOKEN), checkpoint=checkpoint,
+        metrics_port=METRICS_PORT and METRICS_PORT + index, ledger=ledger,
+        watcher=FileWatcher(roster_file),
+        make_bot=lambda token: telegram.Bot(token=token),
+        select=lambda roster: shard(roster, index, workers.value))
+    logging.info(
+        f'Worker {index} of {workers.value} owns {len(engine.tenants)} '
+        f'of {len(tenants)} tenants')
+    SHARD_SIZE.set_function(lambda: len(engine.tenants), worker=index)
+    if engine.limiter is not None:
+        engine.limiter.divide(workers.value)
+    follower = asyncio.create_task(follow_shard(engine, index, workers))
+    try:
+        await engine.run()
+    finally:
+        follower.cancel()
+        checkpoint.close()
+        ledger.close()
+
+
+def run_worker(index, workers):
+    """Worker process entry point."""
+    from log_logic import LOG_FILE, build_handlers, setup_logging
+    signal.signal(signal.SIGTTIN, signal.SIG_DFL)
+    signal.signal(signal.SIGTTOU, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    listener = setup_logging(
+        handlers=build_handlers(LOG_FILE and f'{LOG_FILE}.{index}'))
+    try:
+        asyncio.run(serve_shard(index, workers))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.stop()
+
+
+class Supervisor:
+    """Keeps one worker process running per shard.
+
+    SIGTTIN adds a worker and SIGTTOU removes one; running workers pick
+    up the new count and move only the tenants whose owner changed.
+    Signal handlers only record the request, the supervision loop applies
+    it between its checks.
+    """
+
+    def __init__(self, count=WORKER_COUNT, target=run_worker, context=None):
+        """Prepares count workers, call start() to spawn them."""
+        self.context = context or multiprocessing.get_context()
+        self.target = target
+        self.workers = self.context.Value('i', max(count, 1))
+        self.wanted = self.workers.value
+        self.reload = False
+        self.processes = {}
+
+    def _spawn(self, index):
+        process = self.context.Process(
+            target=self.target, args=(index, self.workers),
+            name=f'worker-{index}')
+        process.start()
+        self.processes[index] = process
+        logging.info(f'Started worker {index}, pid {process.pid}')
+
+    def start(self):
+        """Starts the workers."""
+        return self.resize(self.workers.value)
+
+    def resize(self, count):
+        """Changes the number of workers."""
+        count = max(count, 1)
+        self.workers.value = count
+        for index in range(count):
+            if index not in self.processes:
+                self._spawn(index)
+        for index in sorted(self.processes):
+            if index >= count:
+                process = self.processes.pop(index)
+                process.terminate()
+                process.join()
+                logging.info(f'Stopped worker {index}')
+        return self
+
+    def check(self):
+        """Restarts workers that have exited, returns how many."""
+        dead = [
+            index for index, process in self.processes.items()
+            if not process.is_alive()
+        ]
+        for index in dead:
+            logging.warning(
+                f'Worker {index} exited with '
+                f'{self.processes[index].exitcode}, restarting')
+            self._spawn(index)
+        return len(dead)
+
+    def request(self, delta):
+        """Asks the supervision loop to add or remove delta workers."""
+        self.wanted = max(self.wanted + delta, 1)
+
+    def supervise(self):
+        """Applies requested changes, restarts exited workers."""
+        if self.wanted != self.workers.value:
+            self.resize(self.wanted)
+        if self.reload:
+            self.reload = False
+            self.hangup()
+        return self.check()
+
+    def hangup(self):
+        """Asks every worker to reload the roster."""
+        for process in self.processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGHUP)
+
+    def stop(self, timeout=None):
+        """Terminates every worker, killing those still alive after timeout.
+
+        SIGTERM lets a worker drain its polls and messages first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            process.join(
+                None if deadline is None
+                else max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logging.warning(f'Worker pid {process.pid} killed')
+                process.kill()
+                process.join()
+        self.processes.clear()
+
+    def run(self, interval=SHARD_CHECK_INTERVAL):
+        """Supervises workers until interrupted."""
+        self.start()
+        signal.signal(signal.SIGTTIN, lambda *args: self.request(1))
+        signal.signal(signal.SIGTTOU, lambda *args: self.request(-1))
+        signal.signal(
+            signal.SIGHUP, lambda *args: setattr(self, 'reload', True))
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            while True:
+                self.supervise()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop(SHUTDOWN_TIMEOUT + 1)
+
+
+def main():
+    """Runs one shard worker, or a supervisor of WORKER_COUNT workers.
+
+    A worker runs in place when WORKER_INDEX is set or the process is a
+    numbered Heroku dyno; WORKER_COUNT must then match the dyno count.
+    Webhooks are refused: workers would compete for WEBHOOK_PORT and each
+    one only knows the chats of its own shard.
+    """
+    if not TELEGRAM_TOKEN:
+        logging.error('Tokens cant be validated')
+        raise TokensValidationError('Tokens cant be validated')
+    if WEBHOOK_PORT:
+        logging.error('WEBHOOK_PORT is not supported in sharded mode')
+        raise TokensValidationError(
+            'WEBHOOK_PORT is not supported in sharded mode, '
+            'run engine.py or homework.py to accept webhooks')
+    index = dyno_index() if WORKER_INDEX is None else int(WORKER_INDEX)
+    if index is not None:
+        run_worker(index, multiprocessing.Value('i', WORKER_COUNT))
+        return
+    Supervisor().run()
+
+
+if __name__ == '__main__':
+    from log_logic import setup_logging
+    listener = setup_logging()
+    try:
+        main()
+    finally:
+        listener.stop()
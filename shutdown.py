@@ -0,0 +1,148 @@
+from concurrent.futures import Executor, Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 20))
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class DaemonExecutor(Executor):
+    """Thread pool whose threads never delay the exit of the process.
+
+    ThreadPoolExecutor joins its threads at interpreter exit, so a single
+    hung API request would keep a stopping dyno alive past its deadline.
+    """
+
+    def __init__(self, max_workers):
+        """Starts threads on demand, up to max_workers."""
+        self.max_workers = max_workers
+        self._queue = queue.SimpleQueue()
+        self._idle = threading.Semaphore(0)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, fn, /, *args, **kwargs):
+        """Schedules fn(*args, **kwargs), returns its future."""
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('Cannot schedule after shutdown')
+            self._queue.put((future, fn, args, kwargs))
+            if (not self._idle.acquire(timeout=0)
+                    and len(self._threads) < self.max_workers):
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return future
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as error:
+                    future.set_exception(error)
+            self._idle.release()
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        """Stops the threads once queued calls are done."""
+        with self._lock:
+            self._shutdown = True
+            for _ in self._threads:
+                self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+class Shutdown:
+    """Turns SIGTERM, SIGINT and SIGHUP into flags of the poll loop.
+
+    Sleeps of the loop end as soon as a signal arrives, so a dyno restart
+    does not wait for the next poll. SIGHUP only asks for a reload.
+    """
+
+    def __init__(self):
+        """Starts with nothing requested."""
+        self.requested = False
+        self.requested_at = None
+        self.reload = False
+        self._wakeup = threading.Event()
+
+    def install(self):
+        """Installs the signal handlers, must be called from main thread."""
+        for signum in STOP_SIGNALS:
+            signal.signal(signum, self.stop)
+        signal.signal(signal.SIGHUP, self.hangup)
+        return self
+
+    def stop(self, *args):
+        """Asks the loop to stop."""
+        if not self.requested:
+            logging.info('Получен сигнал остановки, завершаем работу')
+            self.requested_at = time.monotonic()
+        self.requested = True
+        self._wakeup.set()
+
+    def remaining(self, timeout=SHUTDOWN_TIMEOUT):
+        """Returns what is left of timeout since the stop was requested."""
+        if self.requested_at is None:
+            return timeout
+        return max(timeout - (time.monotonic() - self.requested_at), 0)
+
+    def hangup(self, *args):
+        """Asks the loop to reload its configuration."""
+        self.reload = True
+        self._wakeup.set()
+
+    def sleep(self, delay, on_reload=None, watcher=None):
+        """Sleeps for delay, calling on_reload on every SIGHUP.
+
+        With a watcher on_reload is also called when its file changes,
+        checked every watcher.interval. Returns False if the loop should
+        stop.
+        """
+        deadline = time.monotonic() + delay
+        while not self.requested:
+            if self.reload:
+                self.reload = False
+                if on_reload is not None:
+                    on_reload()
+            elif (on_reload is not None and watcher is not None
+                    and watcher.changed()):
+                on_reload()
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return True
+            if watcher is not None:
+                timeout = min(timeout, watcher.interval)
+            if self._wakeup.wait(timeout):
+                self._wakeup.clear()
+        return False
+
+    def result(self, future, grace=SHUTDOWN_TIMEOUT / 2):
+        """Waits for the future, giving it grace seconds after a stop.
+
+        Returns None if the call was abandoned, its thread must be a
+        daemon so it does not keep the process alive.
+        """
+        future.add_done_callback(lambda done: self._wakeup.set())
+        while not future.done() and not self.requested:
+            self._wakeup.wait()
+            self._wakeup.clear()
+        try:
+            return future.result(grace if self.requested else None)
+        except FutureTimeoutError:
+            logging.warning('Опрос не завершился до остановки, прерываем')
+            return None
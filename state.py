@@ -0,0 +1,109 @@
+import threading
+
+KNOWN_STATUSES = (None, 'approved', 'reviewing', 'rejected')
+
+_CODES = {status: code for code, status in enumerate(KNOWN_STATUSES)}
+_NAMES = list(KNOWN_STATUSES)
+_REGISTRY_LOCK = threading.Lock()
+
+
+def status_code(status):
+    """Returns small integer code of the status, registering new ones."""
+    try:
+        code = _CODES.get(status)
+    except TypeError:
+        return status_code(repr(status))
+    if code is None:
+        with _REGISTRY_LOCK:
+            code = _CODES.get(status)
+            if code is None:
+                _NAMES.append(status)
+                code = _CODES[status] = len(_NAMES) - 1
+    return code
+
+
+def status_name(code):
+    """Returns the status a code stands for."""
+    return _NAMES[code]
+
+
+class StatusIndex:
+    """Last seen status of every homework, keyed by homework id or name.
+
+    Statuses are kept as small integer codes shared by all tenants.
+    """
+
+    __slots__ = ('_statuses',)
+
+    def __init__(self, statuses=None):
+        """Starts from {key: status} of a checkpoint, if any."""
+        self._statuses = {
+            key: status_code(status)
+            for key, status in dict(statuses or {}).items()
+        }
+
+    @staticmethod
+    def key(homework):
+        """Returns the key identifying the homework across polls."""
+        return homework.get('id', homework.get('homework_name'))
+
+    def diff(self, homeworks):
+        """Returns homeworks whose status changed and remembers them.
+
+        Malformed records are passed through for the parser to report.
+        """
+        staged = {}
+        changed = list(self.changes(homeworks, staged))
+        self.update(staged)
+        return changed
+
+    def changes(self, homeworks, staged):
+        """Yields homeworks whose status changed without remembering them.
+
+        New status codes are put into staged, so records can be compared
+        as they arrive and committed with update() once all are read.
+        """
+        for homework in homeworks:
+            if not isinstance(homework, dict):
+                yield homework
+                continue
+            key = self.key(homework)
+            code = status_code(homework.get('status'))
+            if staged.get(key, self._statuses.get(key)) != code:
+                staged[key] = code
+                yield homework
+
+    def update(self, staged):
+        """Remembers status codes staged by changes()."""
+        self._statuses.update(staged)
+
+    def get(self, key):
+        """Returns last seen status of the homework."""
+        code = self._statuses.get(key)
+        return None if code is None else _NAMES[code]
+
+    def items(self):
+        """Returns pairs of homework key and its last seen status."""
+        return [(key, _NAMES[code]) for key, code in self._statuses.items()]
+
+    def __len__(self):
+        """Returns number of known homeworks."""
+        return len(self._statuses)
+
+
+class Change:
+    """Status change of a homework kept in the tenant history."""
+
+    __slots__ = ('at', 'key', 'name', 'code')
+
+    def __init__(self, at, key, name, status):
+        """Interns the status to its code."""
+        self.at = int(at)
+        self.key = key
+        self.name = name
+        self.code = status_code(status)
+
+    @property
+    def status(self):
+        """Returns the status the homework changed to."""
+        return _NAMES[self.code]
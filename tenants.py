@@ -0,0 +1,122 @@
+from exceptions import TokensValidationError
+from http_cache import ResponseCache
+from state import Change, StatusIndex
+
+import json
+import os
+import threading
+import time
+
+HISTORY_SIZE = int(os.getenv('HISTORY_SIZE', 20))
+ROSTER_CHECK_INTERVAL = float(os.getenv('ROSTER_CHECK_INTERVAL', 5))
+
+
+class Tenant:
+    """Practicum account paired with the Telegram chat it reports to.
+
+    Tens of thousands of tenants live in one process, so the state is kept
+    in slots, timestamps are integers and the history is a short list only
+    allocated once the first change is seen.
+    """
+
+    __slots__ = ('token', 'chat_id', 'cursor', 'statuses', 'cache', 'lock',
+                 'history', 'checked_at')
+
+    def __init__(self, token, chat_id, cursor=None):
+        """Starts polling from cursor, now by default."""
+        self.token = token
+        self.chat_id = chat_id
+        self.cursor = int(cursor or time.time())
+        self.statuses = StatusIndex()
+        self.cache = ResponseCache()
+        self.lock = threading.Lock()
+        self.history = ()
+        self.checked_at = None
+
+    def remember(self, parsed, at=None):
+        """Adds parsed status changes to the history of the tenant."""
+        if not parsed:
+            return
+        at = at or time.time()
+        changes = [
+            Change(at, record.key, record.name, record.status)
+            for record in parsed
+        ]
+        with self.lock:
+            self.history = (list(self.history) + changes)[-HISTORY_SIZE:]
+
+    def __repr__(self):
+        """Shows the chat only, tokens must not reach logs."""
+        return f'Tenant(chat_id={self.chat_id!r})'
+
+
+def parse_roster(data):
+    """Builds tenants from a list of roster entries."""
+    if not isinstance(data, list):
+        raise TokensValidationError('Roster must be a list')
+    tenants = []
+    for entry in data:
+        if not isinstance(entry, dict):
+            raise TokensValidationError('Roster entry is not a dictionary')
+        token = entry.get('practicum_token')
+        chat_id = entry.get('chat_id')
+        if not all((token, chat_id)):
+            raise TokensValidationError(
+                f'Roster entry for chat {chat_id} cant be validated')
+        tenants.append(Tenant(token, chat_id))
+    return tenants
+
+
+def load_roster(path):
+    """Reads tenant roster from a JSON file."""
+    with open(path, encoding='utf-8') as file:
+        return parse_roster(json.load(file))
+
+
+def merge_roster(current, fresh):
+    """Keeps tenants of the current roster that the fresh one still lists.
+
+    A tenant is identified by its chat, so a changed Practicum token is
+    swapped in place and the statuses and cursor of the tenant survive.
+    Returns the merged roster and the tenants whose token was rotated.
+    """
+    known = {tenant.chat_id: tenant for tenant in current}
+    roster = []
+    rotated = []
+    for tenant in fresh:
+        kept = known.get(tenant.chat_id)
+        if kept is None:
+            roster.append(tenant)
+            continue
+        if kept.token != tenant.token:
+            with kept.lock:
+                kept.token = tenant.token
+                kept.cache.clear()
+            rotated.append(kept)
+        roster.append(kept)
+    return roster, rotated
+
+
+class FileWatcher:
+    """Tells when a file was modified since it was last read."""
+
+    def __init__(self, path, interval=ROSTER_CHECK_INTERVAL):
+        """Remembers the current state of the file."""
+        self.path = path
+        self.interval = interval
+        self._stamp = self._stat()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed(self):
+        """Returns True once after every modification of the file."""
+        stamp = self._stat()
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        return True
@@ -1,9 +1,51 @@
 import sys
 from os.path import abspath, dirname
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 
 pytest_plugins = [
     'tests.fixtures.fixture_data'
 ]
+
+
+class MockBot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class MockCoalescer:
+
+    def __init__(self):
+        self.added = []
+
+    def add(self, chat_id, key, message, delivery_id=None):
+        self.added.append((chat_id, key, message))
+
+
+@pytest.fixture
+def bot():
+    return MockBot()
+
+
+@pytest.fixture
+def coalescer():
+    return MockCoalescer()
+
+
+@pytest.fixture
+def mock_fetch():
+    def fetch(current_timestamp, token, *args, **kwargs):
+        homeworks = []
+        if current_timestamp < 1000:
+            homeworks.append(
+                {'homework_name': f'hw_{token}', 'status': 'approved'})
+        return {'homeworks': homeworks, 'current_date': 1000}
+
+    return fetch
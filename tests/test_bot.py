@@ -640,3 +640,48 @@ class TestHomework:
                 f'Убедитесь, что в функции `{func_name}` обрабатываете ситуацию, '
                 'когда API возвращает код, отличный от 200'
             )
+
+    def test_next_cursor(self, random_timestamp):
+        import homework
+
+        response = {'homeworks': [], 'current_date': random_timestamp}
+        assert homework.next_cursor(response, 1) == random_timestamp, (
+            'Проверьте, что следующий from_date берётся из `current_date`'
+        )
+        assert homework.next_cursor({'homeworks': []}, 5) == 5, (
+            'Без `current_date` курсор не должен меняться'
+        )
+
+    def test_parse_homeworks_batch(self):
+        import homework
+
+        records = [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'unknown'},
+            'not a dict',
+            {'id': 3, 'status': 'rejected'},
+            {'homework_name': 'hw4', 'status': 'reviewing'},
+        ]
+        parsed, errors = homework.parse_homeworks(records)
+        assert [record.key for record in parsed] == [1, 'hw4'], (
+            'Проверьте, что корректные записи разбираются, '
+            'несмотря на ошибки в соседних'
+        )
+        assert parsed[0].message == homework.parse_status(records[0])
+        assert parsed[1].message.endswith(self.HOMEWORK_STATUSES['reviewing'])
+        assert [type(error) for _, error in errors] == [
+            homework.HomeworkStatusError, TypeError, KeyError
+        ]
+
+    def test_parse_status_not_dict(self):
+        import homework
+
+        try:
+            homework.parse_status(['homework_name'])
+        except TypeError:
+            pass
+        else:
+            assert False, (
+                'Убедитесь, что `parse_status` проверяет тип записи '
+                'до чтения ключей'
+            )
@@ -0,0 +1,36 @@
+class TestCheckpoint:
+
+    def test_restore_after_restart(self, tmp_path):
+        from checkpoint import Checkpoint
+        from homework import parse_homeworks
+        from tenants import Tenant
+
+        path = tmp_path / 'state.sqlite3'
+        tenant = Tenant('token', 42, cursor=100)
+        homeworks = [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'approved'},
+        ]
+        checkpoint = Checkpoint(path)
+        tenant.cursor = 200
+        parsed, _ = parse_homeworks(tenant.statuses.diff(homeworks))
+        checkpoint.save(tenant, parsed)
+        checkpoint.close()
+
+        restarted = Tenant('token', 42)
+        other = Tenant('token', 43, cursor=1)
+        checkpoint = Checkpoint(path)
+        assert checkpoint.restore([restarted, other]) == 1
+        checkpoint.close()
+        assert restarted.cursor == 200, (
+            'Проверьте, что курсор восстанавливается после перезапуска'
+        )
+        assert other.cursor == 1
+        missed = [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'rejected'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'approved'},
+        ]
+        assert restarted.statuses.diff(missed) == [missed[0]], (
+            'После перезапуска должны отправляться только пропущенные '
+            'изменения статуса'
+        )
@@ -0,0 +1,105 @@
+import pytest
+
+
+class TestCircuitBreaker:
+
+    def make(self, clock):
+        from circuit import CircuitBreaker
+
+        return CircuitBreaker(threshold=3, reset_timeout=60,
+                              clock=lambda: clock[0])
+
+    def fail(self):
+        from exceptions import APIUnavailableException
+
+        raise APIUnavailableException('API not available')
+
+    def test_opens_after_consecutive_failures(self):
+        from circuit import CLOSED, OPEN
+        from exceptions import APIUnavailableException, CircuitOpenException
+
+        clock = [1000]
+        breaker = self.make(clock)
+        for _ in range(3):
+            assert breaker.state == CLOSED
+            with pytest.raises(APIUnavailableException):
+                breaker.call(self.fail)
+        assert breaker.state == OPEN, (
+            'После threshold ошибок подряд цепь должна размыкаться'
+        )
+        calls = []
+        clock[0] += 10
+        with pytest.raises(CircuitOpenException) as error:
+            breaker.call(calls.append, 1)
+        assert not calls, 'Разомкнутая цепь не должна пропускать запросы'
+        assert error.value.retry_after == 50
+
+    def test_success_resets_failures(self):
+        from circuit import CLOSED
+
+        breaker = self.make([1000])
+        for _ in range(5):
+            with pytest.raises(Exception):
+                breaker.call(self.fail)
+            assert breaker.call(int, '1') == 1
+        assert breaker.state == CLOSED
+
+    def test_other_errors_are_not_failures(self):
+        from circuit import CLOSED
+
+        breaker = self.make([1000])
+        for _ in range(5):
+            with pytest.raises(KeyError):
+                breaker.call({}.__getitem__, 'homeworks')
+        assert breaker.state == CLOSED, (
+            'Ошибки разбора ответа не должны размыкать цепь'
+        )
+
+    def test_half_open_probe(self):
+        from circuit import CLOSED, HALF_OPEN, OPEN
+        from exceptions import CircuitOpenException
+
+        clock = [1000]
+        breaker = self.make(clock)
+        for _ in range(3):
+            with pytest.raises(Exception):
+                breaker.call(self.fail)
+        clock[0] += 60
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(Exception):
+            breaker.call(self.fail)
+        assert breaker.state == OPEN, (
+            'Неудачная проба должна снова размыкать цепь'
+        )
+        clock[0] += 60
+        breaker.allow()
+        with pytest.raises(CircuitOpenException):
+            breaker.allow()
+        breaker.success()
+        assert breaker.state == CLOSED, (
+            'Удачная проба должна замыкать цепь'
+        )
+
+    def test_rejected_tokens_are_not_failures(self, monkeypatch):
+        import requests
+
+        import homework
+        from circuit import CLOSED
+        from exceptions import APIRequestRejectedException
+        from tenants import Tenant
+
+        class MockResponse:
+            status_code = 401
+            headers = {}
+
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: MockResponse())
+        breaker = self.make([1000])
+        for number in range(5):
+            with pytest.raises(APIRequestRejectedException):
+                homework.poll_changes(Tenant(f'revoked{number}', number),
+                                      breaker=breaker)
+        assert breaker.state == CLOSED, (
+            'Отозванный токен одного тенанта не должен размыкать цепь '
+            'для всех'
+        )
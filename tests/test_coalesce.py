@@ -0,0 +1,36 @@
+class TestCoalescer:
+
+    def test_changes_merged_per_chat(self, bot):
+        from coalesce import Coalescer
+
+        coalescer = Coalescer(bot, window=60)
+        coalescer.add(1, 'hw1', 'hw1 reviewing')
+        coalescer.add(1, 'hw2', 'hw2 approved')
+        coalescer.add(1, 'hw1', 'hw1 rejected')
+        coalescer.add(2, 'hw3', 'hw3 approved')
+        assert bot.sent == [], (
+            'До окончания окна сообщения не должны отправляться'
+        )
+        coalescer.stop()
+        assert sorted(bot.sent) == [
+            (1, 'hw1 rejected\n\nhw2 approved'),
+            (2, 'hw3 approved'),
+        ], (
+            'Изменения одного чата должны объединяться в одно сообщение, '
+            'промежуточные статусы отбрасываться'
+        )
+        assert coalescer.collapsed == 1
+
+    def test_window_flush(self, bot):
+        import time
+
+        from coalesce import Coalescer
+
+        coalescer = Coalescer(bot, window=0.05).start()
+        coalescer.add(1, 'hw1', 'first')
+        coalescer.add(1, 'hw2', 'second')
+        deadline = time.monotonic() + 5
+        while not bot.sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        coalescer.stop()
+        assert bot.sent == [(1, 'first\n\nsecond')]
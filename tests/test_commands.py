@@ -0,0 +1,107 @@
+import threading
+import time
+from types import SimpleNamespace
+
+
+class TestCommands:
+
+    def poll(self, tenant, homeworks, monkeypatch, coalescer):
+        import homework
+
+        def mock_fetch(current_timestamp, token, *args):
+            return {'homeworks': homeworks, 'current_date': 1000}
+
+        monkeypatch.setattr(homework, 'fetch_homeworks', mock_fetch)
+        parsed, _ = homework.parse_homeworks(homework.poll_changes(tenant))
+        homework.notify(coalescer, None, tenant, parsed)
+
+    def test_status_and_history(self, monkeypatch, coalescer):
+        from commands import NOT_SUBSCRIBED, NOTHING_YET, CommandServer
+        from tenants import Tenant
+
+        tenant = Tenant('token', 42, cursor=1)
+        server = CommandServer([tenant])
+        assert server.reply(7, 'status') == NOT_SUBSCRIBED
+        assert server.reply(42, 'status') == NOTHING_YET
+        self.poll(tenant, [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'},
+        ], monkeypatch, coalescer)
+        self.poll(tenant, [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'rejected'},
+        ], monkeypatch, coalescer)
+        status = server.reply(42, 'status')
+        assert 'hw1: принята' in status and 'hw2: возвращена' in status, (
+            'Команда /status должна отвечать из кеша статусов'
+        )
+        history = server.reply(42, 'history').splitlines()
+        assert [line.split(' ', 2)[2] for line in history] == [
+            'hw2: возвращена с замечаниями',
+            'hw1: принята',
+            'hw1: на ревью',
+        ], 'Команда /history должна перечислять изменения от новых к старым'
+
+    def test_reply_does_not_wait_for_api(self, monkeypatch, coalescer):
+        import homework
+        from commands import CommandServer
+        from tenants import Tenant
+
+        tenant = Tenant('token', 42, cursor=1)
+        self.poll(tenant, [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'},
+        ], monkeypatch, coalescer)
+        release = threading.Event()
+
+        def hanging_fetch(current_timestamp, token, *args):
+            release.wait(5)
+            return {'homeworks': [], 'current_date': 1000}
+
+        monkeypatch.setattr(homework, 'fetch_homeworks', hanging_fetch)
+        poller = threading.Thread(
+            target=homework.poll_changes, args=(tenant,))
+        poller.start()
+        replies = []
+        server = CommandServer([tenant])
+        update = SimpleNamespace(
+            effective_chat=SimpleNamespace(id=42), message=None,
+            effective_message=SimpleNamespace(
+                text='/status@homework_bot', reply_text=replies.append))
+        start = time.perf_counter()
+        server._handle(update, None)
+        elapsed = time.perf_counter() - start
+        release.set()
+        poller.join()
+        assert elapsed < 0.5, (
+            'Ответ на команду не должен ждать ответа API'
+        )
+        assert replies and 'hw1: на ревью' in replies[0]
+
+    def test_status_names_survive_restart(self, tmp_path, monkeypatch,
+                                         coalescer):
+        import homework
+        from checkpoint import Checkpoint
+        from commands import CommandServer
+        from tenants import Tenant
+
+        path = tmp_path / 'state.sqlite3'
+        tenant = Tenant('token', 42, cursor=1)
+        monkeypatch.setattr(homework, 'fetch_homeworks', lambda *args: {
+            'homeworks': [
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            ],
+            'current_date': 1000,
+        })
+        checkpoint = Checkpoint(path)
+        parsed, _ = homework.parse_homeworks(homework.poll_changes(tenant))
+        homework.notify(coalescer, checkpoint, tenant, parsed)
+        checkpoint.close()
+
+        restarted = Tenant('token', 42)
+        checkpoint = Checkpoint(path)
+        checkpoint.restore([restarted])
+        server = CommandServer([restarted], checkpoint=checkpoint)
+        status = server.reply(42, 'status')
+        checkpoint.close()
+        assert status.startswith('hw1: принята'), (
+            'После перезапуска /status должен показывать названия работ'
+        )
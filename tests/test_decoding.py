@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+
+class TestDecoding:
+
+    def body(self, count):
+        return json.dumps({
+            'current_date': 1000198000,
+            'homeworks': [
+                {'id': number, 'homework_name': f'работа {number}',
+                 'status': 'approved'}
+                for number in range(count)
+            ],
+        }, ensure_ascii=False).encode()
+
+    def test_loads_matches_stdlib(self):
+        from decoding import loads
+
+        body = self.body(3)
+        assert loads(body) == json.loads(body)
+
+    @pytest.mark.parametrize('chunk_size', [1, 7, 64, 1 << 16])
+    def test_stream_yields_records(self, chunk_size):
+        from decoding import HomeworkStream
+
+        body = self.body(50)
+        stream = HomeworkStream(
+            body[start:start + chunk_size]
+            for start in range(0, len(body), chunk_size))
+        homeworks = list(stream)
+        assert [hw['id'] for hw in homeworks] == list(range(50)), (
+            'Проверьте, что домашки читаются по одной без потерь'
+        )
+        assert homeworks[7]['homework_name'] == 'работа 7'
+        assert stream.current_date == 1000198000
+
+    def test_stream_errors(self):
+        from decoding import HomeworkStream
+
+        with pytest.raises(KeyError):
+            list(HomeworkStream([b'{"current_date": 1}']))
+        assert list(HomeworkStream([b'{"homeworks": [1]}'])) == [1], (
+            'Запись не-словарь должна передаваться парсеру, как без стриминга'
+        )
+        with pytest.raises(ValueError):
+            list(HomeworkStream([b'{"homeworks": [{"id": 1}, ']))
+
+    def test_poll_stream(self, monkeypatch):
+        import requests
+
+        import homework
+        from tenants import Tenant
+
+        body = self.body(5)
+
+        class MockResponse:
+            status_code = 200
+
+            def iter_content(self, chunk_size):
+                return iter([body[:10], body[10:]])
+
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: MockResponse())
+        tenant = Tenant('token', 1, cursor=1)
+        changed = homework.poll_stream(tenant)
+        assert len(changed) == 5
+        assert tenant.cursor == 1000198000
+
+    def test_poll_stream_broken_connection(self, monkeypatch):
+        import requests
+
+        import homework
+        from exceptions import APIUnavailableException
+        from tenants import Tenant
+
+        body = self.body(2)
+        broken = [True]
+
+        class MockResponse:
+            status_code = 200
+
+            def iter_content(self, chunk_size):
+                yield body[:60]
+                if broken[0]:
+                    raise requests.ConnectionError('Connection reset')
+                yield body[60:]
+
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: MockResponse())
+        tenant = Tenant('token', 1, cursor=1)
+        with pytest.raises(APIUnavailableException):
+            homework.poll_stream(tenant)
+        assert len(tenant.statuses) == 0 and tenant.cursor == 1, (
+            'Оборванный стрим не должен менять состояние тенанта'
+        )
+        broken[0] = False
+        assert len(homework.poll_stream(tenant)) == 2, (
+            'Следующий опрос должен сообщить обо всех изменениях'
+        )
@@ -0,0 +1,243 @@
+import asyncio
+import json
+
+import pytest
+
+
+class TestEngine:
+
+    def test_load_roster(self, tmp_path):
+        from tenants import load_roster
+
+        path = tmp_path / 'roster.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'a', 'chat_id': 1},
+            {'practicum_token': 'b', 'chat_id': 2},
+        ]))
+        tenants = load_roster(path)
+        assert [t.chat_id for t in tenants] == [1, 2], (
+            'Проверьте, что ростер загружается целиком'
+        )
+
+    def test_load_roster_invalid(self):
+        from exceptions import TokensValidationError
+        from tenants import parse_roster
+
+        with pytest.raises(TokensValidationError):
+            parse_roster([{'chat_id': 1}])
+
+    def test_poll_many_tenants(self, monkeypatch, bot, mock_fetch):
+        import engine
+        import homework
+        from outbox import Outbox
+        from tenants import Tenant
+
+        monkeypatch.setattr(homework, 'fetch_homeworks', mock_fetch)
+        tenants = [Tenant(str(i), i, cursor=1) for i in range(200)]
+        outbox = Outbox(bot, global_rate=100000).start()
+        polling = engine.PollingEngine(
+            tenants, outbox, max_concurrency=8, coalesce_window=0,
+            limiter=None)
+
+        async def poll_all():
+            await asyncio.gather(*(polling.poll_tenant(t) for t in tenants))
+            await asyncio.gather(*(polling.poll_tenant(t) for t in tenants))
+
+        asyncio.run(poll_all())
+        polling.coalescer.stop()
+        assert outbox.stop(timeout=5)
+        assert len(bot.sent) == 200, (
+            'Каждый тенант должен получить одно сообщение, '
+            'повторный опрос без изменений не отправляет сообщений'
+        )
+        assert {chat_id for chat_id, _ in bot.sent} == set(range(200))
+        assert all(t.cursor == 1000 for t in tenants), (
+            'Проверьте, что курсор from_date сдвигается по current_date'
+        )
+
+    def test_checkpoint_does_not_block_loop(self, monkeypatch, coalescer,
+                                            mock_fetch):
+        import time
+
+        import engine
+        import homework
+        from tenants import Tenant
+
+        class SlowCheckpoint:
+            def save(self, tenant, parsed):
+                time.sleep(0.5)
+
+        monkeypatch.setattr(homework, 'fetch_homeworks', mock_fetch)
+        tenant = Tenant('token', 1, cursor=1)
+        polling = engine.PollingEngine(
+            [tenant], coalescer, checkpoint=SlowCheckpoint(),
+            coalesce_window=0, limiter=None)
+        polling.coalescer = coalescer
+
+        async def poll_and_tick():
+            ticks = 0
+            polled = asyncio.ensure_future(polling.poll_tenant(tenant))
+            while not polled.done():
+                ticks += 1
+                await asyncio.sleep(0.01)
+            return ticks, polled.result()
+
+        ticks, messages = asyncio.run(poll_and_tick())
+        assert len(messages) == 1
+        assert ticks > 10, (
+            'Запись чекпойнта не должна останавливать цикл событий'
+        )
+
+
+class TestRosterReload:
+
+    def test_merge_roster_rotates_in_place(self):
+        from tenants import Tenant, merge_roster
+
+        kept = Tenant('old', 1, cursor=500)
+        kept.statuses.diff([{'id': 7, 'status': 'reviewing'}])
+        kept.cache.etag = 'W/"1"'
+        roster, rotated = merge_roster(
+            [kept, Tenant('b', 2)], [Tenant('new', 1), Tenant('c', 3)])
+        assert roster[0] is kept, (
+            'Тенант, оставшийся в ростере, должен сохраниться'
+        )
+        assert rotated == [kept] and kept.token == 'new', (
+            'Проверьте, что сменившийся токен подменяется на месте'
+        )
+        assert kept.cursor == 500 and kept.statuses.get(7) == 'reviewing'
+        assert kept.cache.etag is None, (
+            'Кэш ответа старого токена должен сбрасываться'
+        )
+        assert [tenant.chat_id for tenant in roster] == [1, 3]
+
+    def test_file_watcher(self, tmp_path):
+        from tenants import FileWatcher
+
+        path = tmp_path / 'roster.json'
+        watcher = FileWatcher(path)
+        assert not watcher.changed()
+        path.write_text('[]')
+        assert watcher.changed(), 'Проверьте, что появление файла замечено'
+        assert not watcher.changed()
+
+    def test_watch_roster(self, tmp_path, monkeypatch):
+        import engine
+        from outbox import Outbox
+        from tenants import FileWatcher, load_roster
+
+        path = tmp_path / 'roster.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'a', 'chat_id': 1},
+            {'practicum_token': 'b', 'chat_id': 2},
+        ]))
+        started = []
+
+        async def run_tenant(tenant, delay=0):
+            started.append(tenant.chat_id)
+            await asyncio.sleep(3600)
+
+        polling = engine.PollingEngine(
+            load_roster(path), Outbox(None), limiter=None,
+            watcher=FileWatcher(path, interval=0.01))
+        monkeypatch.setattr(polling, 'run_tenant', run_tenant)
+
+        async def reload():
+            first, polling.tenants = polling.tenants, []
+            polling.assign(first)
+            watching = asyncio.create_task(polling.watch_roster())
+            await asyncio.sleep(0.05)
+            kept = polling._tasks[1]
+            path.write_text(json.dumps([
+                {'practicum_token': 'rotated', 'chat_id': 1},
+                {'practicum_token': 'c', 'chat_id': 3},
+            ]))
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if polling._tasks.keys() == {1, 3}:
+                    break
+            watching.cancel()
+            tasks = dict(polling._tasks)
+            for task in tasks.values():
+                task.cancel()
+            return kept, tasks
+
+        kept, tasks = asyncio.run(reload())
+        assert tasks.keys() == {1, 3}, (
+            'Новый тенант должен запуститься, удалённый — остановиться'
+        )
+        assert tasks[1] is kept, (
+            'Опрос тенанта со сменившимся токеном не должен перезапускаться'
+        )
+        assert polling.tenants[0].token == 'rotated'
+        assert started == [1, 2, 3]
+        polling._executor.shutdown()
+        polling.session.close()
+
+    def test_reload_tokens(self, tmp_path, monkeypatch):
+        import homework
+        from tenants import Tenant
+
+        env = tmp_path / '.env'
+        env.write_text(
+            'PRACTICUM_TOKEN=rotated\nTELEGRAM_TOKEN=bot\n'
+            'TELEGRAM_CHAT_ID=42\n')
+        monkeypatch.setattr(homework, 'ENV_FILE', str(env))
+        monkeypatch.setattr(homework, 'TOKENS', {
+            'PRACTICUM_TOKEN': 'old', 'TELEGRAM_TOKEN': 'bot',
+            'TELEGRAM_CHAT_ID': '42'})
+        for name in homework.TOKENS:
+            monkeypatch.setattr(homework, name, homework.TOKENS[name])
+        tenant = Tenant('old', '42', cursor=500)
+        tenant.cache.etag = 'W/"1"'
+        changed = homework.reload_tokens(tenant)
+        assert changed == ['PRACTICUM_TOKEN'], (
+            'Проверьте, что токены перечитываются из .env'
+        )
+        assert tenant.token == 'rotated' and tenant.cursor == 500
+        assert homework.PRACTICUM_TOKEN == 'rotated'
+        assert tenant.cache.etag is None
+        assert homework.reload_tokens(tenant) == []
+
+    def test_env_file_precedence(self, tmp_path):
+        import os
+        import subprocess
+        import sys
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        os.symlink(os.path.join(root, 'homework.py'), tmp_path / 'homework.py')
+        (tmp_path / '.env').write_text(
+            'PRACTICUM_TOKEN=dotenv\nTELEGRAM_TOKEN=dotenv\n'
+            'TELEGRAM_CHAT_ID=42\n')
+        script = (
+            'import homework\n'
+            'print(homework.TOKENS == homework.read_tokens(), '
+            'homework.PRACTICUM_TOKEN)\n')
+        result = subprocess.run(
+            [sys.executable, '-c', script], capture_output=True, text=True,
+            timeout=30, cwd=tmp_path, env={
+                **os.environ, 'PYTHONPATH': f'{tmp_path}{os.pathsep}{root}',
+                'PRACTICUM_TOKEN': 'environment'})
+        assert result.stdout.split() == ['True', 'dotenv'], (
+            'При запуске и при перечитывании .env должен быть важнее '
+            'окружения, иначе первый SIGHUP сменит токены'
+        )
+
+    def test_reload_bot(self, tmp_path, monkeypatch):
+        import engine
+        import homework
+        from outbox import Outbox
+
+        env = tmp_path / '.env'
+        env.write_text('TELEGRAM_TOKEN=rotated\n')
+        monkeypatch.setattr(homework, 'ENV_FILE', str(env))
+        polling = engine.PollingEngine(
+            [], Outbox(None), limiter=None,
+            make_bot=lambda token: f'bot {token}')
+        polling.telegram_token = 'old'
+        assert polling.reload_bot()
+        assert polling.outbox.bot == 'bot rotated', (
+            'После смены TELEGRAM_TOKEN сообщения должен слать новый бот'
+        )
+        assert not polling.reload_bot()
+        polling.session.close()
@@ -0,0 +1,67 @@
+from http import HTTPStatus
+
+import requests
+
+
+class MockResponse:
+
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def json(self):
+        raise AssertionError('Неизменённый ответ не должен декодироваться')
+
+
+class TestResponseCache:
+
+    def test_validators_sent_and_304_skipped(self, monkeypatch):
+        import homework
+        from http_cache import ResponseCache
+
+        cache = ResponseCache()
+        cache.etag = '"abc"'
+        seen = {}
+
+        def mock_get(url, headers=None, params=None, **kwargs):
+            seen.update(headers)
+            return MockResponse(HTTPStatus.NOT_MODIFIED)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        result = homework.fetch_homeworks(1, 'token', cache=cache)
+        assert result is homework.NOT_MODIFIED
+        assert seen['If-None-Match'] == '"abc"', (
+            'Проверьте, что ETag отправляется в If-None-Match'
+        )
+
+    def test_body_hash_ignores_current_date(self):
+        from http_cache import ResponseCache
+
+        cache = ResponseCache()
+        first = MockResponse(
+            HTTPStatus.OK, b'{"homeworks": [], "current_date": 100}',
+            {'ETag': '"v1"'})
+        second = MockResponse(
+            HTTPStatus.OK, b'{"homeworks": [], "current_date": 160}')
+        changed = MockResponse(
+            HTTPStatus.OK,
+            b'{"homeworks": [{"id": 1}], "current_date": 220}')
+        assert not cache.not_modified(first)
+        assert cache.validators() == {'If-None-Match': '"v1"'}
+        assert cache.not_modified(second), (
+            'Ответ, отличающийся только current_date, считается неизменным'
+        )
+        assert not cache.not_modified(changed)
+        assert cache.hits == 1
+
+    def test_poll_changes_skips_unchanged(self, monkeypatch):
+        import homework
+        from tenants import Tenant
+
+        tenant = Tenant('token', 1, cursor=1)
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: MockResponse(HTTPStatus.NOT_MODIFIED))
+        assert homework.poll_changes(tenant) == []
+        assert tenant.cursor == 1
@@ -0,0 +1,83 @@
+import time
+
+
+class TestHttpSession:
+
+    def test_build_session_pool(self):
+        from http_session import build_session
+
+        session = build_session(pool_size=7, retries=2)
+        adapter = session.get_adapter('https://practicum.yandex.ru/')
+        assert adapter._pool_maxsize == 7, (
+            'Проверьте, что размер пула соединений настраивается'
+        )
+        assert adapter.max_retries.total == 2, (
+            'Проверьте, что адаптер повторяет неудачные запросы'
+        )
+        session.close()
+
+    def test_read_timeout_not_retried(self):
+        import socket
+
+        import pytest
+        import requests
+
+        from http_session import build_session
+
+        server = socket.create_server(('127.0.0.1', 0))
+        host, port = server.getsockname()
+        session = build_session(retries=3)
+        started = time.monotonic()
+        with pytest.raises(requests.ConnectionError):
+            session.get(f'http://{host}:{port}/', timeout=0.3)
+        elapsed = time.monotonic() - started
+        session.close()
+        server.close()
+        assert elapsed < 1, (
+            f'Зависший ответ не должен ждать timeout на каждую попытку, '
+            f'запрос занял {elapsed:.1f} с'
+        )
+
+    def test_hedged_session(self):
+        from http_session import HedgedSession
+
+        class SlowFirst:
+            def __init__(self):
+                self.calls = 0
+                self.closed = []
+
+            def get(self, url, **kwargs):
+                self.calls += 1
+                number = self.calls
+                if number == 1:
+                    time.sleep(0.5)
+                return Response(number, self.closed)
+
+            def close(self):
+                pass
+
+        class Response:
+            def __init__(self, number, closed):
+                self.number = number
+                self.closed = closed
+
+            def close(self):
+                self.closed.append(self.number)
+
+        session = SlowFirst()
+        hedged = HedgedSession(session, min_samples=3, min_delay=0.01,
+                               budget=1, workers=2)
+        assert hedged.deadline() is None
+        hedged._latencies.extend([0.01, 0.01, 0.01])
+        start = time.perf_counter()
+        response = hedged.get('http://practicum/')
+        assert time.perf_counter() - start < 0.4, (
+            'Медленный запрос должен дублироваться после дедлайна'
+        )
+        assert response.number == 2
+        assert hedged.hedged == 1
+        hedged.close()
+        time.sleep(0.6)
+        assert session.closed == [1], (
+            'Проигравший ответ должен закрываться'
+        )
@@ -0,0 +1,191 @@
+KILLED_BEFORE_SENDING = '''
+import os
+import signal
+import sys
+
+sys.path.insert(0, {root!r})
+import homework
+from checkpoint import Checkpoint
+from coalesce import Coalescer
+from ledger import DeliveryLedger
+from tenants import Tenant
+
+tenant = Tenant('token', 42, cursor=100)
+changed = homework.apply_response(tenant, {payload!r})
+parsed, _ = homework.parse_homeworks(changed)
+ledger = DeliveryLedger({path!r})
+coalescer = Coalescer(None, window=60, ledger=ledger).start()
+homework.notify(coalescer, Checkpoint({path!r}), tenant, parsed)
+os.kill(os.getpid(), signal.SIGKILL)
+'''
+
+
+class TestDeliveryLedger:
+
+    def records(self, status='approved', updated='2022-01-01T10:00:00Z'):
+        from homework import parse_homeworks
+
+        parsed, _ = parse_homeworks([
+            {'id': 1, 'homework_name': 'hw1', 'status': status,
+             'date_updated': updated},
+        ])
+        return parsed
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        from ledger import BloomFilter
+
+        bloom = BloomFilter(1000, error_rate=0.01)
+        items = [str(number).encode() for number in range(1000)]
+        for item in items:
+            bloom.add(item)
+        assert all(item in bloom for item in items)
+        false_positives = sum(
+            str(number).encode() in bloom for number in range(1000, 11000))
+        assert false_positives < 300, (
+            'Доля ложных срабатываний должна быть около error_rate'
+        )
+
+    def test_delivery_id(self):
+        from ledger import delivery_id
+
+        record, = self.records()
+        assert delivery_id(1, record) == delivery_id('1', record)
+        assert delivery_id(1, record) != delivery_id(2, record)
+        changed, = self.records(updated='2022-01-02T10:00:00Z')
+        assert delivery_id(1, record) != delivery_id(1, changed), (
+            'Повторная проверка с тем же статусом — новое уведомление'
+        )
+
+    def test_seen_after_restart_and_expires(self, tmp_path):
+        from ledger import DeliveryLedger, delivery_id
+
+        clock = [1000]
+        path = tmp_path / 'state.sqlite3'
+        record, = self.records()
+        delivery = delivery_id(1, record)
+        ledger = DeliveryLedger(path, ttl=100, clock=lambda: clock[0])
+        assert not ledger.seen(delivery)
+        ledger.commit([delivery])
+        assert ledger.seen(delivery)
+        ledger.close()
+        ledger = DeliveryLedger(path, ttl=100, clock=lambda: clock[0])
+        assert ledger.seen(delivery), (
+            'Журнал доставок должен переживать перезапуск'
+        )
+        clock[0] += 150
+        assert not ledger.seen(delivery), (
+            'Записи старше ttl должны забываться'
+        )
+        ledger.commit([b'other'])
+        count, = ledger.connection.execute(
+            'SELECT COUNT(*) FROM deliveries').fetchone()
+        assert count == 1, 'Просроченные записи должны удаляться'
+        ledger.close()
+
+    def test_outbox_and_coalescer_skip_delivered(self, tmp_path, bot):
+        from coalesce import Coalescer
+        from ledger import DeliveryLedger, delivery_id
+        from outbox import Outbox
+
+        ledger = DeliveryLedger(tmp_path / 'state.sqlite3')
+        outbox = Outbox(bot, per_chat_interval=0, global_rate=100000,
+                        ledger=ledger).start()
+        coalescer = Coalescer(outbox, window=0, ledger=ledger)
+        first, = self.records()
+        second, = self.records(status='rejected')
+        coalescer.add(1, first.key, first.message, delivery_id(1, first))
+        coalescer.stop()
+        assert outbox.flush(timeout=5)
+        outbox.send_message(1, first.message, [delivery_id(1, first)])
+        coalescer = Coalescer(outbox, window=0, ledger=ledger)
+        coalescer.add(1, first.key, first.message, delivery_id(1, first))
+        coalescer.add(1, 'hw2', second.message, delivery_id(1, second))
+        coalescer.stop()
+        assert outbox.stop(timeout=5)
+        assert bot.sent == [(1, first.message), (1, second.message)], (
+            'Уже доставленные уведомления не должны отправляться повторно'
+        )
+        assert outbox.duplicates == 1 and coalescer.duplicates == 1
+        ledger.close()
+
+    def test_undelivered_survive_kill(self, tmp_path, bot):
+        import subprocess
+        import sys
+        from os.path import abspath, dirname
+
+        import homework
+        from checkpoint import Checkpoint
+        from coalesce import Coalescer
+        from ledger import DeliveryLedger
+        from outbox import Outbox
+        from tenants import Tenant
+
+        path = str(tmp_path / 'state.sqlite3')
+        payload = {
+            'homeworks': [{'id': 1, 'homework_name': 'hw1',
+                           'status': 'approved'}],
+            'current_date': 200,
+        }
+        script = KILLED_BEFORE_SENDING.format(
+            root=dirname(dirname(abspath(__file__))), payload=payload,
+            path=path)
+        killed = subprocess.run([sys.executable, '-c', script], timeout=30)
+        assert killed.returncode == -9
+
+        tenant = Tenant('token', 42)
+        checkpoint = Checkpoint(path)
+        ledger = DeliveryLedger(path)
+        assert checkpoint.restore([tenant]) == 1
+        assert homework.apply_response(tenant, payload) == [], (
+            'Восстановленное состояние уже считает изменение увиденным'
+        )
+        outbox = Outbox(bot, per_chat_interval=0, global_rate=100000,
+                        ledger=ledger).start()
+        coalescer = Coalescer(outbox, window=0, ledger=ledger)
+        assert coalescer.requeue([tenant]) == 1, (
+            'Неотправленное до падения уведомление должно вернуться в очередь'
+        )
+        coalescer.stop()
+        assert outbox.stop(timeout=5)
+        assert [chat_id for chat_id, _ in bot.sent] == [42]
+        assert ledger.pending([42]) == [], (
+            'После отправки уведомление не должно оставаться в очереди'
+        )
+        checkpoint.close()
+        ledger.close()
+
+    def test_requeued_confirmed_across_processes(self, tmp_path):
+        from ledger import DeliveryLedger
+
+        path = tmp_path / 'state.sqlite3'
+        owner = DeliveryLedger(path)
+        owner.expect(1, 7, 'approved', b'moved')
+        successor = DeliveryLedger(path)
+        assert successor.pending([1]) == [('1', 7, 'approved', b'moved')]
+        owner.commit([b'moved'])
+        assert successor.seen(b'moved'), (
+            'Уведомление, отправленное прежним владельцем шарда, '
+            'не должно отправляться повторно'
+        )
+        owner.commit([b'fresh'])
+        assert not successor.seen(b'fresh')
+        shared = DeliveryLedger(path, shared=True)
+        assert shared.seen(b'fresh'), (
+            'В общем файле воркеров доставки проверяются по базе'
+        )
+        for ledger in (owner, successor, shared):
+            ledger.close()
+
+    def test_pending_keeps_latest_status(self, tmp_path):
+        from ledger import DeliveryLedger
+
+        ledger = DeliveryLedger(tmp_path / 'state.sqlite3')
+        ledger.expect(1, 7, 'reviewing', b'first')
+        ledger.expect(1, 7, 'approved', b'second')
+        ledger.expect(2, 7, 'rejected', b'other chat')
+        assert ledger.pending([1]) == [('1', 7, 'approved', b'second')], (
+            'Промежуточный статус не должен отправляться после перезапуска'
+        )
+        ledger.commit([b'second'])
+        assert ledger.pending([1]) == []
+        ledger.close()
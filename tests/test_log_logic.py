@@ -0,0 +1,45 @@
+import io
+import json
+import logging
+
+
+class TestLogLogic:
+
+    def test_queue_logging_json(self):
+        from log_logic import JsonFormatter, setup_logging
+
+        root = logging.getLogger()
+        saved_handlers, saved_level = list(root.handlers), root.level
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(JsonFormatter())
+        listener = setup_logging('INFO', handlers=[handler])
+        try:
+            logging.debug('skipped %s', 'debug')
+            logging.info('Request to API sent')
+        finally:
+            listener.stop()
+            for added in list(root.handlers):
+                root.removeHandler(added)
+            for saved in saved_handlers:
+                root.addHandler(saved)
+            root.setLevel(saved_level)
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 1, (
+            'Сообщения ниже настроенного уровня не должны записываться'
+        )
+        record = json.loads(lines[0])
+        assert record['message'] == 'Request to API sent'
+        assert record['level'] == 'INFO'
+
+    def test_rotating_file_handler(self, tmp_path):
+        from logging.handlers import RotatingFileHandler
+
+        from log_logic import build_handlers
+
+        handlers = build_handlers(tmp_path / 'bot.log', json_format=False)
+        assert any(isinstance(h, RotatingFileHandler) for h in handlers), (
+            'Проверьте, что при заданном LOG_FILE включается ротация логов'
+        )
+        for handler in handlers:
+            handler.close()
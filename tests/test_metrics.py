@@ -0,0 +1,48 @@
+from urllib.request import urlopen
+
+import pytest
+
+
+class TestMetrics:
+
+    def test_timed_records_calls_and_errors(self):
+        import metrics
+
+        @metrics.timed('test_call')
+        def call(fail):
+            if fail:
+                raise KeyError('boom')
+            return 'ok'
+
+        assert call(False) == 'ok'
+        with pytest.raises(KeyError):
+            call(True)
+        assert metrics.CALL_DURATION.count(function='test_call') == 2
+        assert metrics.CALL_ERRORS.value(
+            function='test_call', exception='KeyError') == 1, (
+            'Проверьте, что исключения считаются по классу'
+        )
+
+    def test_pipeline_functions_keep_signature(self):
+        import homework
+        import utils
+
+        utils.check_function(homework, 'check_response', 1)
+        utils.check_function(homework, 'parse_status', 1)
+
+    def test_endpoint_serves_prometheus_text(self):
+        import metrics
+
+        histogram = metrics.Histogram('test_latency_seconds', 'Test')
+        histogram.observe(0.02, stage='poll')
+        server = metrics.serve(port=0, host='127.0.0.1')
+        try:
+            host, port = server.server_address
+            with urlopen(f'http://{host}:{port}/metrics') as response:
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert '# TYPE test_latency_seconds histogram' in body
+        assert 'test_latency_seconds_bucket{stage="poll",le="0.025"} 1' in body
+        assert 'test_latency_seconds_count{stage="poll"} 1' in body
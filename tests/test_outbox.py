@@ -0,0 +1,114 @@
+import time
+
+from telegram.error import NetworkError, RetryAfter
+
+
+class FlakyBot:
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, text, time.monotonic()))
+
+
+class TestOutbox:
+
+    def test_send_message_does_not_block(self):
+        from outbox import Outbox
+
+        bot = FlakyBot()
+        outbox = Outbox(bot, per_chat_interval=0, global_rate=100000)
+        for number in range(10):
+            outbox.send_message(number % 2, f'message {number}')
+        assert outbox.depth() == 10, (
+            'Сообщения должны ставиться в очередь без ожидания Telegram'
+        )
+        outbox.start()
+        assert outbox.stop(timeout=5)
+        assert len(bot.sent) == 10
+        assert outbox.stats()['sent'] == 10
+
+    def test_per_chat_interval(self):
+        from outbox import Outbox
+
+        bot = FlakyBot()
+        outbox = Outbox(bot, per_chat_interval=0.05, global_rate=100000)
+        outbox.start()
+        for number in range(3):
+            outbox.send_message(1, f'message {number}')
+        assert outbox.stop(timeout=5)
+        moments = [moment for _, _, moment in bot.sent]
+        assert moments[2] - moments[0] >= 0.09, (
+            'Проверьте, что соблюдается лимит сообщений в один чат'
+        )
+
+    def test_retry_after_and_network_errors(self):
+        from outbox import Outbox
+
+        bot = FlakyBot([RetryAfter(0.05), NetworkError('boom')])
+        outbox = Outbox(bot, per_chat_interval=0, global_rate=100000,
+                        retry_delay=0.01)
+        outbox.start()
+        started = time.monotonic()
+        outbox.send_message(1, 'hello')
+        assert outbox.stop(timeout=10)
+        assert [text for _, text, _ in bot.sent] == ['hello'], (
+            'Сообщение должно быть доставлено после 429 и сетевой ошибки'
+        )
+        assert time.monotonic() - started >= 0.05
+
+    def test_retry_after_holds_every_chat(self):
+        from outbox import Outbox
+
+        bot = FlakyBot([RetryAfter(0.2)] * 2)
+        outbox = Outbox(bot, per_chat_interval=0, global_rate=100000,
+                        max_attempts=2)
+        outbox.send_message(1, 'flooded')
+        outbox.start()
+        time.sleep(0.05)
+        started = time.monotonic()
+        outbox.send_message(2, 'other chat')
+        assert outbox.stop(timeout=10)
+        assert [text for _, text, _ in bot.sent] == ['other chat'], (
+            'После max_attempts ответов 429 сообщение должно отбрасываться'
+        )
+        assert bot.sent[0][2] - started >= 0.1, (
+            'Ожидание 429 действует на все чаты бота'
+        )
+        assert outbox.stats()['failed'] == 1
+
+    def test_stop_is_bounded_by_timeout(self):
+        from outbox import Outbox
+
+        class SlowBot(FlakyBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                time.sleep(5)
+
+        outbox = Outbox(SlowBot(), per_chat_interval=0).start()
+        outbox.send_message(1, 'first')
+        outbox.send_message(2, 'second')
+        started = time.monotonic()
+        assert not outbox.stop(timeout=0.5), (
+            'Неотправленная очередь должна возвращать False'
+        )
+        assert time.monotonic() - started < 1.5, (
+            'Остановка очереди не должна превышать таймаут'
+        )
+
+    def test_unexpected_errors_do_not_stop_sender(self):
+        from outbox import Outbox
+
+        bot = FlakyBot([OSError('recorder is closed')])
+        outbox = Outbox(
+            bot, per_chat_interval=0, global_rate=100000, retry_delay=0.01)
+        outbox.start()
+        outbox.send_message(1, 'first')
+        outbox.send_message(2, 'second')
+        assert outbox.stop(timeout=5), (
+            'Ошибка не из Telegram не должна останавливать отправку'
+        )
+        assert sorted(text for _, text, _ in bot.sent) == ['first', 'second']
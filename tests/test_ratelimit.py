@@ -0,0 +1,99 @@
+import asyncio
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.now += delay
+
+
+class TestRateLimiter:
+
+    def make(self, clock, **options):
+        from ratelimit import RateLimiter
+
+        return RateLimiter(clock=clock, sleep=clock.sleep, **options)
+
+    def test_global_rate(self):
+        clock = FakeClock()
+        limiter = self.make(clock, rate=10, burst=5, token_rate=100,
+                            token_burst=100)
+        start = clock.now
+        delays = [limiter.acquire(f'token{n}') for n in range(25)]
+        assert delays[:5] == [0] * 5, 'Запас burst выдаётся без ожидания'
+        assert abs(clock.now - start - 2) < 1e-9, (
+            'Сверх burst запросы должны идти не чаще rate в секунду'
+        )
+
+    def test_divided_between_workers(self):
+        clock = FakeClock()
+        limiter = self.make(clock, rate=12, burst=4, token_rate=100,
+                            token_burst=100)
+        limiter.divide(4)
+        start = clock.now
+        for number in range(31):
+            limiter.acquire(f'token{number}')
+        assert abs(clock.now - start - 10) < 1e-9, (
+            'Каждый из четырёх воркеров должен получать четверть rate'
+        )
+        limiter.divide(2)
+        start = clock.now
+        for number in range(12):
+            limiter.acquire(f'token{number}')
+        assert abs(clock.now - start - 2) < 1e-9, (
+            'После изменения числа воркеров доля rate пересчитывается'
+        )
+
+    def test_per_token_rate(self):
+        clock = FakeClock()
+        limiter = self.make(clock, rate=100, burst=100, token_rate=1,
+                            token_burst=2)
+        assert limiter.reserve('a') == 0
+        assert limiter.reserve('a') == 0
+        assert limiter.reserve('a') == 1, (
+            'Запросы одного токена ограничиваются отдельно'
+        )
+        assert limiter.reserve('b') == 0, (
+            'Лимит одного токена не должен задерживать другие'
+        )
+
+    def test_state_is_bounded(self):
+        clock = FakeClock()
+        limiter = self.make(clock, rate=1000, burst=1000, token_rate=1,
+                            token_burst=2)
+        for number in range(3000):
+            limiter.reserve(f'token{number}')
+            clock.now += 0.1
+        assert len(limiter._granted) < 700, (
+            'Выданные резервы старше окна должны удаляться без /metrics'
+        )
+        assert len(limiter._buckets) < 700, (
+            'Бакеты простаивающих и удалённых токенов должны удаляться'
+        )
+
+    def test_utilization(self):
+        clock = FakeClock()
+        limiter = self.make(clock, rate=1, burst=60)
+        for n in range(30):
+            limiter.acquire(str(n))
+        assert limiter.utilization() == 0.5
+        clock.now += 61
+        assert limiter.utilization() == 0
+
+    def test_acquire_async(self):
+        from ratelimit import RateLimiter
+
+        limiter = RateLimiter(rate=100, burst=1)
+
+        async def acquire_all():
+            return await asyncio.gather(
+                *(limiter.acquire_async(str(n)) for n in range(3)))
+
+        delays = sorted(asyncio.run(acquire_all()))
+        assert delays[0] == 0 and 0.015 < delays[2] <= 0.02
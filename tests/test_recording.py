@@ -0,0 +1,83 @@
+import json
+
+
+class MockResponse:
+
+    def __init__(self, data, status_code=200):
+        self.status_code = status_code
+        self.content = json.dumps(data).encode()
+        self.headers = {}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class MockSession:
+
+    def __init__(self, clock):
+        self.clock = clock
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        status = 'reviewing' if self.clock[0] < 5000 else 'approved'
+        return MockResponse({
+            'homeworks': [
+                {'id': 1, 'homework_name': 'hw1', 'status': status}
+            ],
+            'current_date': int(self.clock[0]),
+        })
+
+    def close(self):
+        pass
+
+
+class TestRecording:
+
+    def record(self, path, bot):
+        import homework
+        from recording import Recorder, RecordingBot, RecordingSession
+
+        clock = [1000]
+        recorder = Recorder(path, clock=lambda: clock[0])
+        session = RecordingSession(MockSession(clock), recorder)
+        bot = RecordingBot(bot, recorder)
+        while clock[0] <= 10000:
+            response = homework.fetch_homeworks(
+                clock[0], 'secret-token', session)
+            if clock[0] in (1000, 5000):
+                bot.send_message(42, 'status changed')
+            assert homework.check_response(response)
+            clock[0] += 500
+        recorder.close()
+
+    def test_log_hides_tokens(self, tmp_path, bot):
+        from recording import pseudonym, read_log
+
+        path = tmp_path / 'traffic.jsonl.gz'
+        self.record(path, bot)
+        events = list(read_log(path))
+        assert len(events) == 21
+        assert 'secret-token' not in json.dumps(events), (
+            'Токены не должны попадать в журнал'
+        )
+        assert events[0]['tenant'] == pseudonym('secret-token')
+        assert [e for e in events if e['kind'] == 'telegram'][0]['chat'] == (
+            pseudonym(42))
+
+    def test_replay_runs_loop_on_virtual_clock(self, tmp_path, bot):
+        from recording import replay
+
+        path = tmp_path / 'traffic.jsonl.gz'
+        self.record(path, bot)
+        report = replay(path, retry_time=600)
+        assert report['real_seconds'] < 5, (
+            'Воспроизведение не должно ждать реального времени'
+        )
+        assert report['virtual_seconds'] == 9000
+        assert report['recorded_messages'] == 2
+        assert report['messages'] == 2, (
+            'Воспроизведение должно отправить сообщение о каждом статусе'
+        )
+        assert report['polls'] >= 9000 / 660
+        assert report['latency_max'] <= 660, (
+            'Смена статуса должна замечаться не позже следующего опроса'
+        )
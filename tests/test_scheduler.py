@@ -0,0 +1,55 @@
+class TestPollScheduler:
+
+    def make(self):
+        from scheduler import PollScheduler
+
+        return PollScheduler(fast=60, normal=600, slow=1800,
+                             max_backoff=3600, jitter=0, clock=lambda: 1000)
+
+    def test_interval_follows_statuses(self):
+        from tenants import Tenant
+
+        scheduler = self.make()
+        tenant = Tenant('token', 1)
+        assert scheduler.success(tenant) == 600
+        tenant.statuses.diff([{'id': 1, 'status': 'reviewing'}])
+        assert scheduler.success(tenant) == 60, (
+            'Работа на ревью должна опрашиваться чаще'
+        )
+        tenant.statuses.diff([{'id': 1, 'status': 'approved'}])
+        assert scheduler.success(tenant) == 1800, (
+            'Принятые работы должны опрашиваться реже'
+        )
+        assert scheduler.schedule() == {1: 2800}
+        assert scheduler.request_rate() == 1 / 1800
+
+    def test_backoff_on_api_errors(self):
+        from exceptions import APIUnavailableException
+        from tenants import Tenant
+
+        scheduler = self.make()
+        tenant = Tenant('token', 1)
+        delays = [
+            scheduler.failure(tenant, APIUnavailableException())
+            for _ in range(8)
+        ]
+        assert 60 <= delays[0] <= 120
+        assert all(delay <= 3600 for delay in delays), (
+            'Пауза не должна превышать max_backoff'
+        )
+        assert delays[-1] >= 1800
+        scheduler.success(tenant)
+        assert scheduler.failure(tenant, APIUnavailableException()) <= 120, (
+            'После успешного запроса счётчик ошибок должен сбрасываться'
+        )
+
+    def test_waits_for_open_circuit(self):
+        from exceptions import CircuitOpenException
+        from tenants import Tenant
+
+        scheduler = self.make()
+        tenant = Tenant('token', 1)
+        assert scheduler.failure(
+            tenant, CircuitOpenException('API calls suspended', 45)) == 45, (
+            'При разомкнутой цепи опрос откладывается до пробы'
+        )
@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+
+def idle(index, workers):
+    time.sleep(30)
+
+
+class TestHashRing:
+
+    def test_keys_spread_over_nodes(self):
+        from sharding import HashRing
+
+        ring = HashRing(range(4))
+        owners = [ring.node(chat_id) for chat_id in range(10000)]
+        for node in range(4):
+            assert 1500 < owners.count(node) < 3500, (
+                'Ключи должны распределяться по узлам примерно поровну'
+            )
+
+    def test_adding_node_moves_fraction(self):
+        from sharding import HashRing
+
+        ring = HashRing(range(4))
+        before = {key: ring.node(key) for key in range(10000)}
+        ring.add(4)
+        moved = [key for key in before if ring.node(key) != before[key]]
+        assert 1000 < len(moved) < 3000, (
+            'Новый узел должен забирать около 1/N ключей'
+        )
+        assert all(ring.node(key) == 4 for key in moved), (
+            'Ключи должны переезжать только на новый узел'
+        )
+        ring.remove(4)
+        assert all(ring.node(key) == before[key] for key in before)
+
+    def test_shard_partitions_roster(self):
+        from sharding import shard
+        from tenants import Tenant
+
+        tenants = [Tenant(str(i), i) for i in range(1000)]
+        shards = [shard(tenants, index, 3) for index in range(3)]
+        owned = [tenant.chat_id for part in shards for tenant in part]
+        assert sorted(owned) == list(range(1000)), (
+            'Каждый тенант должен принадлежать ровно одному воркеру'
+        )
+
+    def test_dyno_index(self):
+        from sharding import dyno_index
+
+        assert dyno_index('sharded.3') == 2
+        assert dyno_index('local') is None
+
+
+class TestShardedEngine:
+
+    def test_webhook_refused(self, monkeypatch):
+        import pytest
+
+        import sharding
+        from exceptions import TokensValidationError
+
+        monkeypatch.setattr(sharding, 'TELEGRAM_TOKEN', 'bot')
+        monkeypatch.setattr(sharding, 'WEBHOOK_PORT', 8080)
+        with pytest.raises(TokensValidationError):
+            sharding.main()
+
+    def test_assign_applies_diff(self, monkeypatch):
+        import engine
+        from outbox import Outbox
+        from tenants import Tenant
+
+        started = []
+
+        async def run_tenant(tenant, delay=0):
+            started.append(tenant.chat_id)
+            await asyncio.sleep(3600)
+
+        tenants = [Tenant(str(i), i) for i in range(4)]
+        polling = engine.PollingEngine(tenants[:3], Outbox(None))
+        monkeypatch.setattr(polling, 'run_tenant', run_tenant)
+
+        async def reassign():
+            first = polling.tenants
+            polling.tenants = []
+            polling.assign(first)
+            await asyncio.sleep(0)
+            kept = polling._tasks[1]
+            added, removed = polling.assign(tenants[1:])
+            await asyncio.sleep(0)
+            assert polling._tasks[1] is kept, (
+                'Оставшиеся тенанты не должны перезапускаться'
+            )
+            assert polling._tasks.keys() == {1, 2, 3}
+            for task in polling._tasks.values():
+                task.cancel()
+            return added, removed
+
+        added, removed = asyncio.run(reassign())
+        assert [tenant.chat_id for tenant in added] == [3]
+        assert [tenant.chat_id for tenant in removed] == [0]
+        assert started == [0, 1, 2, 3]
+
+
+class TestSupervisor:
+
+    def test_resize_and_restart(self):
+        import multiprocessing
+
+        from sharding import Supervisor
+
+        supervisor = Supervisor(
+            2, target=idle, context=multiprocessing.get_context('fork'))
+        try:
+            supervisor.start()
+            assert sorted(supervisor.processes) == [0, 1]
+            supervisor.resize(3)
+            assert sorted(supervisor.processes) == [0, 1, 2]
+            assert supervisor.workers.value == 3
+            supervisor.resize(1)
+            assert sorted(supervisor.processes) == [0]
+            supervisor.processes[0].kill()
+            supervisor.processes[0].join()
+            assert supervisor.check() == 1, (
+                'Упавший воркер должен перезапускаться'
+            )
+            assert supervisor.processes[0].is_alive()
+        finally:
+            supervisor.stop()
+
+    def test_signals_only_request_resize(self):
+        import multiprocessing
+
+        from sharding import Supervisor
+
+        supervisor = Supervisor(
+            1, target=idle, context=multiprocessing.get_context('fork'))
+        try:
+            supervisor.start()
+            supervisor.request(1)
+            supervisor.request(1)
+            assert sorted(supervisor.processes) == [0], (
+                'Обработчик сигнала не должен менять воркеры во время check()'
+            )
+            supervisor.supervise()
+            assert sorted(supervisor.processes) == [0, 1, 2]
+            supervisor.request(-5)
+            supervisor.supervise()
+            assert sorted(supervisor.processes) == [0]
+        finally:
+            supervisor.stop()
@@ -0,0 +1,174 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+
+FAKE_API = '''
+import sys
+import time
+
+import homework
+
+
+class Bot:
+    sent = 0
+
+    def send_message(self, chat_id, text, **kwargs):
+        Bot.sent += 1
+
+
+def fetch(current_timestamp, token, *args, **kwargs):
+    if token == 'hung' or current_timestamp > 1:
+        time.sleep(60)
+    return {
+        'homeworks': [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}],
+        'current_date': current_timestamp + 1,
+    }
+
+
+homework.fetch_homeworks = fetch
+homework.LIMITER = None
+'''
+
+BOT_LOOP = FAKE_API + '''
+from circuit import CircuitBreaker
+from coalesce import Coalescer
+from outbox import Outbox
+from scheduler import PollScheduler
+from shutdown import Shutdown
+from tenants import Tenant
+
+
+outbox = Outbox(Bot()).start()
+coalescer = Coalescer(outbox, window=0).start()
+shutdown = Shutdown().install()
+print('ready', flush=True)
+homework.serve(
+    Tenant('ok', 1, cursor=1), None, coalescer, None,
+    PollScheduler(fast=0.1, normal=0.1, slow=0.1), CircuitBreaker(),
+    shutdown, None)
+coalescer.stop()
+outbox.stop(timeout=shutdown.remaining())
+print('sent', Bot.sent, flush=True)
+'''
+
+ENGINE = FAKE_API + '''
+import asyncio
+
+import engine
+from outbox import Outbox
+from tenants import Tenant
+
+polling = engine.PollingEngine(
+    [Tenant('ok', 1, cursor=1), Tenant('hung', 2, cursor=1)],
+    Outbox(Bot()), retry_time=0.2, coalesce_window=0, limiter=None,
+    metrics_port=0, shutdown_timeout=1)
+print('ready', flush=True)
+asyncio.run(polling.run())
+print('sent', Bot.sent, flush=True)
+'''
+
+
+def run_until_sigterm(script):
+    """Sends SIGTERM to the script once its polls started.
+
+    Returns seconds until the process exited and its output.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, '-c', script], stdout=subprocess.PIPE, text=True,
+        env={**os.environ, 'PYTHONPATH': root, 'SHUTDOWN_TIMEOUT': '1'})
+    assert process.stdout.readline().strip() == 'ready'
+    time.sleep(1)
+    started = time.monotonic()
+    process.send_signal(signal.SIGTERM)
+    try:
+        output, _ = process.communicate(timeout=30)
+    finally:
+        process.kill()
+    return time.monotonic() - started, output
+
+
+def send_signal(signum, after):
+    timer = threading.Timer(after, os.kill, (os.getpid(), signum))
+    timer.start()
+    return timer
+
+
+@pytest.fixture
+def restore_signals():
+    saved = {
+        signum: signal.getsignal(signum)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)
+    }
+    yield
+    for signum, handler in saved.items():
+        signal.signal(signum, handler)
+
+
+class TestShutdown:
+
+    def test_sleep_wakes_on_stop(self):
+        from shutdown import Shutdown
+
+        shutdown = Shutdown()
+        threading.Timer(0.1, shutdown.stop).start()
+        started = time.monotonic()
+        assert not shutdown.sleep(600)
+        assert time.monotonic() - started < 2, (
+            'Сон между опросами должен прерываться сигналом остановки'
+        )
+
+    def test_sleep_reloads_on_hangup(self):
+        from shutdown import Shutdown
+
+        shutdown = Shutdown()
+        reloads = []
+        threading.Timer(0.05, shutdown.hangup).start()
+        assert shutdown.sleep(0.3, lambda: reloads.append(1)), (
+            'SIGHUP не должен останавливать цикл'
+        )
+        assert reloads == [1]
+
+    def test_sleep_reloads_on_file_change(self, tmp_path):
+        from shutdown import Shutdown
+        from tenants import FileWatcher
+
+        env = tmp_path / '.env'
+        env.write_text('TELEGRAM_TOKEN=old\n')
+        watcher = FileWatcher(str(env), interval=0.05)
+        reloads = []
+        threading.Timer(
+            0.1, env.write_text, ('TELEGRAM_TOKEN=rotated\n',)).start()
+        started = time.monotonic()
+        assert Shutdown().sleep(0.5, lambda: reloads.append(1), watcher)
+        assert reloads == [1], (
+            'Изменение .env должно применяться, не дожидаясь конца паузы'
+        )
+        assert time.monotonic() - started >= 0.5
+
+    def test_bot_loop_exits_on_sigterm(self):
+        elapsed, output = run_until_sigterm(BOT_LOOP)
+        assert elapsed < 3, (
+            f'Процесс бота должен завершаться за SHUTDOWN_TIMEOUT даже с '
+            f'зависшим запросом, а не через {elapsed:.1f} с'
+        )
+        assert output.split() == ['sent', '1'], (
+            'Поставленное в очередь сообщение должно быть отправлено '
+            'до выхода'
+        )
+
+    def test_engine_exits_on_sigterm(self):
+        elapsed, output = run_until_sigterm(ENGINE)
+        assert elapsed < 3, (
+            f'Процесс движка должен завершаться за SHUTDOWN_TIMEOUT даже с '
+            f'зависшим опросом, а не через {elapsed:.1f} с'
+        )
+        assert output.split() == ['sent', '1'], (
+            'Сообщение успешно опрошенного тенанта должно быть отправлено'
+        )
@@ -0,0 +1,45 @@
+class TestStatusIndex:
+
+    def test_diff_reports_only_changed(self):
+        from state import StatusIndex
+
+        statuses = StatusIndex()
+        first = [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+        ]
+        assert statuses.diff(first) == first, (
+            'Все новые домашки должны считаться изменившимися'
+        )
+        second = [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'approved'},
+        ]
+        assert statuses.diff(second) == [second[1]], (
+            'Проверьте, что возвращаются только изменившиеся домашки'
+        )
+        assert statuses.get(2) == 'approved'
+        assert len(statuses) == 2
+
+    def test_changes_are_staged(self):
+        from state import StatusIndex
+
+        statuses = StatusIndex({1: 'reviewing'})
+        staged = {}
+        homeworks = [
+            {'id': 1, 'status': 'reviewing'},
+            {'id': 2, 'status': 'reviewing'},
+            {'id': 2, 'status': 'approved'},
+        ]
+        changed = list(statuses.changes(iter(homeworks), staged))
+        assert changed == homeworks[1:]
+        assert statuses.get(2) is None, (
+            'changes() не должен менять индекс до update()'
+        )
+        statuses.update(staged)
+        assert statuses.get(2) == 'approved'
+
+    def test_key_falls_back_to_name(self):
+        from state import StatusIndex
+
+        assert StatusIndex.key({'homework_name': 'hw1'}) == 'hw1'
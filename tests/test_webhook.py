@@ -0,0 +1,81 @@
+import json
+
+import requests
+
+
+class TestWebhook:
+
+    def test_pushed_events_notify(self, coalescer):
+        import homework
+        from tenants import Tenant
+
+        tenant = Tenant('token', 42, cursor=100)
+        receiver = homework.start_webhook(
+            [tenant], coalescer, None, port=0, host='127.0.0.1',
+            secret='secret')
+        headers = {'X-Webhook-Secret': 'secret'}
+        event = {
+            'homeworks': [
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'}
+            ],
+            'current_date': 500,
+        }
+        try:
+            accepted = requests.post(
+                f'{receiver.url}42', data=json.dumps(event), headers=headers)
+            repeated = requests.post(
+                f'{receiver.url}42', data=json.dumps(event), headers=headers)
+            unknown = requests.post(
+                f'{receiver.url}7', data=json.dumps(event), headers=headers)
+            forbidden = requests.post(
+                f'{receiver.url}42', data=json.dumps(event))
+            invalid = requests.post(
+                f'{receiver.url}42', data='{"current_date": 1}',
+                headers=headers)
+        finally:
+            receiver.stop()
+        assert accepted.status_code == 202 and accepted.text == '1'
+        assert repeated.text == '0', (
+            'Повторное событие без смены статуса не должно уведомлять'
+        )
+        assert unknown.status_code == 404
+        assert forbidden.status_code == 403
+        assert invalid.status_code == 400, (
+            'Событие без `homeworks` должно отклоняться через check_response'
+        )
+        assert [key for _, key, _ in coalescer.added] == [1]
+        assert tenant.cursor == 100, (
+            'Push-события не должны сдвигать курсор опроса'
+        )
+
+    def test_secret_is_required(self, coalescer):
+        import pytest
+
+        import homework
+        from exceptions import TokensValidationError
+
+        with pytest.raises(TokensValidationError):
+            homework.start_webhook(
+                [], coalescer, None, port=0, host='127.0.0.1',
+                secret=None)
+
+    def test_invalid_content_length(self, coalescer):
+        import socket
+
+        import homework
+
+        receiver = homework.start_webhook(
+            [], coalescer, None, port=0, host='127.0.0.1',
+            secret='secret')
+        try:
+            with socket.create_connection(receiver.server.server_address,
+                                          timeout=5) as connection:
+                connection.sendall(
+                    b'POST /homework_statuses/42 HTTP/1.1\r\n'
+                    b'Host: localhost\r\nContent-Length: abc\r\n\r\n')
+                answer = connection.recv(1024)
+        finally:
+            receiver.stop()
+        assert answer.startswith(b'HTTP/1.1 400'), (
+            'Некорректный Content-Length должен отклоняться с кодом 400'
+        )
@@ -0,0 +1,123 @@
+from decoding import loads
+from exceptions import TokensValidationError
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import JSONDecodeError
+
+import hmac
+import logging
+import os
+import threading
+
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 0))
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+RECONCILE_INTERVAL = int(os.getenv('RECONCILE_INTERVAL', 3600))
+EVENTS_PATH = '/homework_statuses/'
+MAX_BODY_SIZE = 1024 * 1024
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Accepts pushed events at /homework_statuses/<chat_id>."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def reply(self, status, text=''):
+        """Sends plain text response."""
+        body = text.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        """Passes event body to the receiver."""
+        receiver = self.server.receiver
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            return self.reply(HTTPStatus.BAD_REQUEST, 'Invalid Content-Length')
+        if length > MAX_BODY_SIZE:
+            self.close_connection = True
+            return self.reply(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = self.rfile.read(length)
+        if not self.path.startswith(EVENTS_PATH):
+            return self.reply(HTTPStatus.NOT_FOUND)
+        if not receiver.authorized(self.headers.get('X-Webhook-Secret')):
+            return self.reply(HTTPStatus.FORBIDDEN)
+        chat_id = self.path[len(EVENTS_PATH):].strip('/')
+        try:
+            changed = receiver.receive(chat_id, loads(body))
+        except (JSONDecodeError, KeyError, TypeError, ValueError) as error:
+            return self.reply(HTTPStatus.BAD_REQUEST, str(error))
+        if changed is None:
+            return self.reply(HTTPStatus.NOT_FOUND, f'Unknown chat {chat_id}')
+        return self.reply(HTTPStatus.ACCEPTED, str(changed))
+
+    def log_message(self, format, *args):
+        """Keeps requests out of the bot log."""
+
+
+class WebhookReceiver:
+    """HTTP receiver of status events pushed in homework_statuses shape.
+
+    Every accepted event is passed to handle(tenant, payload), which
+    returns the number of changes it produced. A secret is required: an
+    open receiver would let anyone make the bot write to its chats.
+    """
+
+    def __init__(self, tenants, handle, port=WEBHOOK_PORT, host='0.0.0.0',
+                 secret=WEBHOOK_SECRET):
+        """Prepares the server, call start() to accept events."""
+        if not secret:
+            logging.error('WEBHOOK_SECRET is required to accept events')
+            raise TokensValidationError(
+                'WEBHOOK_SECRET is required to accept events')
+        self.route(tenants)
+        self.handle = handle
+        self.secret = secret
+        self.received = 0
+        self.server = ThreadingHTTPServer((host, port), WebhookHandler)
+        self.server.daemon_threads = True
+        self.server.receiver = self
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        """Returns base URL of the events endpoint."""
+        host, port = self.server.server_address
+        return f'http://{host}:{port}{EVENTS_PATH}'
+
+    def route(self, tenants):
+        """Replaces the tenants events are accepted for."""
+        self.tenants = {str(tenant.chat_id): tenant for tenant in tenants}
+
+    def authorized(self, secret):
+        """Checks secret sent with the event."""
+        return hmac.compare_digest(secret or '', self.secret)
+
+    def receive(self, chat_id, payload):
+        """Routes event to its tenant, returns number of changes or None."""
+        tenant = self.tenants.get(chat_id)
+        if tenant is None:
+            return None
+        self.received += 1
+        changed = self.handle(tenant, payload)
+        logging.debug('Event for %s produced %s changes', tenant, changed)
+        return changed
+
+    def start(self):
+        """Starts serving in a background thread."""
+        self._thread.start()
+        logging.info(f'Webhook receiver listening on {self.url}')
+        return self
+
+    def stop(self):
+        """Stops the server."""
+        self.server.shutdown()
+        self.server.server_close()